@@ -3,7 +3,7 @@ FastAPI Server for Signature Verification
 Provides REST API endpoints for signature authentication
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
@@ -12,19 +12,99 @@ import cv2
 from PIL import Image
 import io
 import os
+import asyncio
+import tempfile
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Import our modules
 import config
+
+# Worker processes actually serving this app, read from WEB_CONCURRENCY
+# (set by __main__ below; otherwise start with e.g. `WEB_CONCURRENCY=4
+# uvicorn app:app` - uvicorn and gunicorn take it as their worker count,
+# but `--workers 4` alone does NOT set it)
+# Unset = 1 worker, which keeps all CPU threads
+RUNNING_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# Let each worker grab GPU memory as needed instead of all of it upfront
+# (must be set before TensorFlow is imported)
+os.environ.setdefault("TF_FORCE_GPU_ALLOW_GROWTH", "true")
+
+# oneDNN + CPU thread settings (must be set before TensorFlow is imported)
+# With several workers each one gets a single thread (see startup_event).
+# The thread counts are overwritten, not defaulted: workers inherit the
+# environment of `python app.py`, which already set them for 1 process.
+# Core pinning is skipped too - every worker would pin to the SAME cores
+for _name, _value in config.CPU_ENV_VARS.items():
+    if RUNNING_WORKERS > 1 and _name == 'KMP_AFFINITY':
+        continue
+    if RUNNING_WORKERS > 1 and _name.endswith('_THREADS'):
+        os.environ[_name] = '1'
+    else:
+        os.environ.setdefault(_name, _value)
+
+import tensorflow as tf
+
+# orjson (optional - serializes responses several times faster than json)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ONNX Runtime (optional - faster CPU inference than Keras predict)
+try:
+    import tf2onnx
+    import onnxruntime as ort
+except ImportError:
+    tf2onnx = None
+    ort = None
+
+# Import our modules
 import model
+import data_preprocessing
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when it is installed
+    """
+    def render(self, content):
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Signature Verification API",
     description="AI-powered signature authentication system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
+# Registered BEFORE the CORS middleware: the middleware added last runs
+# first, so CORS wraps this one and its 413 responses keep the CORS headers
+# (otherwise the browser reports a CORS error instead of the 413)
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """
+    Reject oversized requests (HTTP 413) from their Content-Length header,
+    before the body is received and buffered
+    Chunked requests have no Content-Length - endpoints that read the raw
+    body (/predict/tensor) enforce their own limit while streaming it
+    """
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() \
+            and int(content_length) > config.MAX_REQUEST_BYTES:
+        return FastJSONResponse(
+            status_code=413,
+            content={"detail": f"Request too large (max {config.MAX_REQUEST_BYTES} bytes)"}
+        )
+    return await call_next(request)
+
+
 # Configure CORS (for frontend access)
 app.add_middleware(
     CORSMiddleware,
@@ -34,34 +114,451 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global variable to store loaded model
-loaded_model = None
 
+# Everything needed to serve the loaded model (see build_serving_state)
+# None = no model loaded
+# A (re)load builds a complete new dict and swaps it in with ONE assignment,
+# so requests and batches in flight never see a half-built model
+serving_state = None
 
-def load_trained_model():
+# Only one (re)load at a time
+reload_lock = threading.Lock()
+
+# Model file the server loads, and its (inode, size, mtime) when last loaded
+MODEL_NAME = 'signature_model_latest'
+MODEL_PATH = os.path.join(config.SAVED_MODELS_DIR, f'{MODEL_NAME}.keras')
+loaded_model_signature = None
+
+# Prediction cache hit/miss counters (the cache itself lives in serving_state)
+cache_stats = {"hits": 0, "misses": 0}
+
+# Queue of (processed_image, future) pairs waiting to be batched
+prediction_queue = None
+batch_worker_task = None
+model_watch_task = None
+running_batches = set()
+
+# Size of a /predict/tensor body: one float32 per model input value
+TENSOR_BODY_BYTES = int(np.prod(config.INPUT_SHAPE)) * 4
+
+# Batch sizes the compiled (XLA) Keras model runs at: 1, 2, 4, 8 ... MAX_BATCH_SIZE
+# XLA compiles once per input shape, so each batch is padded up to the next
+# bucket; every bucket is compiled during warm-up, never on a live request
+BATCH_BUCKETS = sorted({
+    min(2 ** i, config.MAX_BATCH_SIZE)
+    for i in range(config.MAX_BATCH_SIZE.bit_length() + 1)
+})
+
+# Threads that run the blocking model.predict() calls
+PREDICT_POOL = ThreadPoolExecutor(max_workers=config.PREDICT_THREADS)
+
+
+def describe_model(keras_model):
+    """
+    Summarize the model's architecture (parameter count and layers)
+    
+    Parameters:
+    -----------
+    keras_model : keras.Model
+        Loaded classifier
+    
+    Returns:
+    --------
+    architecture : dict
+        Architecture section of the /model/info response
+    """
+    layers_info = []
+    for layer in keras_model.layers:
+        layers_info.append({
+            "name": layer.name,
+            "type": layer.__class__.__name__,
+            "output_shape": str(layer.output.shape)
+        })
+    
+    return {
+        "input_shape": tuple(keras_model.input_shape[1:]),
+        "total_parameters": int(keras_model.count_params()),
+        "layers": layers_info
+    }
+
+
+def build_serving_model(keras_model):
     """
-    Load the trained model at startup
+    Wrap the classifier so a single forward pass returns both the
+    signature embedding (last hidden layer) and the genuine probability
+    
+    Parameters:
+    -----------
+    keras_model : keras.Model
+        Loaded classifier
+    
+    Returns:
+    --------
+    serving_model : keras.Model
+        Model with outputs [embedding (N, 64), probability (N, 1)]
+    """
+    # Logit models get their sigmoid back here
+    classifier = model.with_sigmoid(keras_model)
+    return tf.keras.Model(
+        inputs=keras_model.inputs,
+        outputs=[keras_model.layers[-2].output, classifier.outputs[0]]
+    )
+
+
+def build_serving_fn(keras_model):
+    """
+    Compile the serving model's forward pass into a single graph
+    With config.JIT_COMPILE, XLA fuses each MatMul + BiasAdd + ReLU into
+    one kernel; calling it directly also skips predict()'s per-call setup
+    XLA compiles separately for every batch size, so run_model only ever
+    calls it with one of the BATCH_BUCKETS sizes
+    
+    Parameters:
+    -----------
+    keras_model : keras.Model
+        Model to compile (the serving model)
+    
+    Returns:
+    --------
+    serving_fn : tf.function
+        Takes a float32 batch, returns [embeddings, probabilities] tensors
+    """
+    @tf.function(jit_compile=config.JIT_COMPILE, reduce_retracing=True)
+    def serving_fn(images):
+        return keras_model(images, training=False)
+    
+    return serving_fn
+
+
+def quantize_onnx_int8(onnx_bytes):
+    """
+    Quantize an ONNX model's weights to int8 (dynamic quantization)
+    
+    Weights are stored as int8 (4x smaller than float32) and the matmuls
+    run on int8 kernels (VNNI on modern x86 CPUs)
+    
+    Parameters:
+    -----------
+    onnx_bytes : bytes
+        Serialized float32 ONNX model
+    
+    Returns:
+    --------
+    onnx_bytes : bytes
+        Serialized int8 model, or the original model if quantization failed
+    """
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        
+        # quantize_dynamic works on files - use a private temp folder
+        # so multiple workers never share the same paths
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fp32_path = os.path.join(tmp_dir, 'model_fp32.onnx')
+            int8_path = os.path.join(tmp_dir, 'model_int8.onnx')
+            
+            with open(fp32_path, 'wb') as f:
+                f.write(onnx_bytes)
+            
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+            
+            with open(int8_path, 'rb') as f:
+                int8_bytes = f.read()
+        
+        print(f"✅ Quantized to int8 ({len(onnx_bytes) / 1e6:.1f} MB → {len(int8_bytes) / 1e6:.1f} MB)")
+        return int8_bytes
+        
+    except Exception as e:
+        print(f"⚠️  int8 quantization failed, using float32 model: {str(e)}")
+        return onnx_bytes
+
+
+def build_onnx_session(keras_model):
+    """
+    Convert the Keras model to ONNX and open an ONNX Runtime session
+    
+    Parameters:
+    -----------
+    keras_model : keras.Model
+        Model to convert (the serving model)
+    
+    Returns:
+    --------
+    session : onnxruntime.InferenceSession or None
+        Graph-optimized session, None if ONNX Runtime can't be used
+    input_name : str or None
+        Name of the session's input tensor
     """
-    global loaded_model
+    if not config.USE_ONNX_RUNTIME:
+        return None, None
+    
+    if tf2onnx is None or ort is None:
+        print("ℹ️  onnxruntime/tf2onnx not installed - using Keras predict()")
+        return None, None
     
     try:
-        print("\n" + "="*60)
-        print("🔄 LOADING TRAINED MODEL")
-        print("="*60)
+        print("🔄 Converting model to ONNX...")
+        input_signature = [
+            tf.TensorSpec((None,) + tuple(keras_model.input_shape[1:]), tf.float32, name='input')
+        ]
+        # Converted in memory so multiple workers don't race on a shared file
+        onnx_model, _ = tf2onnx.convert.from_keras(
+            keras_model,
+            input_signature=input_signature,
+            opset=config.ONNX_OPSET
+        )
+        
+        onnx_bytes = onnx_model.SerializeToString()
+        if config.QUANTIZE_INT8:
+            onnx_bytes = quantize_onnx_int8(onnx_bytes)
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if RUNNING_WORKERS > 1:
+            options.intra_op_num_threads = 1
+        
+        session = ort.InferenceSession(
+            onnx_bytes,
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        print("✅ ONNX Runtime session ready!")
         
-        # Try to load the latest model
-        loaded_model = model.load_model('signature_model_latest', format='h5')
+        return session, session.get_inputs()[0].name
         
-        if loaded_model is None:
-            print("⚠️  Warning: No trained model found!")
-            print("   Please train a model first using train.py")
-        else:
+    except Exception as e:
+        print(f"⚠️  ONNX conversion failed, using Keras predict(): {str(e)}")
+        return None, None
+
+
+def build_serving_state(keras_model):
+    """
+    Prepare everything needed to serve a freshly loaded model
+    
+    Parameters:
+    -----------
+    keras_model : keras.Model
+        Loaded classifier
+    
+    Returns:
+    --------
+    state : dict
+        model           - the loaded classifier
+        info            - architecture summary for /model/info
+        input_shape     - model input shape without the batch dimension
+                          ((16384,) for flat-input models, (128, 128, 1)
+                          for older image-input ones)
+        serving_model   - same network returning (embedding, probability)
+        onnx_session    - ONNX Runtime session (None = use Keras)
+        onnx_input_name - name of the session's input tensor
+        serving_fn      - compiled Keras forward pass (when ONNX isn't used)
+        cache           - LRU cache of upload hash → (probability, embedding),
+                          new and empty for every loaded model
+    """
+    serving_model = build_serving_model(keras_model)
+    onnx_session, onnx_input_name = build_onnx_session(serving_model)
+    
+    return {
+        "model": keras_model,
+        "info": describe_model(keras_model),
+        "input_shape": tuple(keras_model.input_shape[1:]),
+        "serving_model": serving_model,
+        "onnx_session": onnx_session,
+        "onnx_input_name": onnx_input_name,
+        "serving_fn": build_serving_fn(serving_model) if onnx_session is None else None,
+        "cache": OrderedDict()
+    }
+
+
+def load_trained_model():
+    """
+    Load the trained model (at startup and on /model/reload)
+    
+    Blocking (conversion + warm-up can take seconds) - call it from a
+    thread, not the event loop, while the server is running.
+    The new model is fully built and warmed up before it replaces the
+    old one, which keeps serving until then - and keeps serving if the
+    new one is missing or fails to load.
+    
+    Returns:
+    --------
+    loaded : bool
+        True if the new model is now serving
+    """
+    global serving_state, loaded_model_signature
+    
+    with reload_lock:
+        try:
+            print("\n" + "="*60)
+            print("🔄 LOADING TRAINED MODEL")
+            print("="*60)
+            
+            # Remember which file version we load (see watch_model_file)
+            loaded_model_signature = model_file_signature()
+            
+            # Try to load the latest model
+            keras_model = model.load_model(MODEL_NAME, format='keras')
+            
+            if keras_model is None:
+                print("⚠️  Warning: No trained model found!")
+                print("   Please train a model first using train.py")
+                if serving_state is not None:
+                    print("   Keeping the model that is already loaded")
+                return False
+            
+            state = build_serving_state(keras_model)
+            warm_up_model(state)
+            
+            # Swap in the new model in one step
+            serving_state = state
             print("✅ Model loaded successfully!")
             print("="*60)
+            return True
             
+        except Exception as e:
+            print(f"❌ Error loading model: {str(e)}")
+            if serving_state is not None:
+                print("   Keeping the model that is already loaded")
+            return False
+
+
+def model_file_signature():
+    """
+    (inode, size, mtime) of the model file, None if it doesn't exist
+    Changes whenever a new model is saved or the 'latest' link is moved
+    """
+    try:
+        stat = os.stat(MODEL_PATH)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+async def watch_model_file():
+    """
+    Background task that reloads the model when its file changes
+    
+    Every worker runs its own copy, so after retraining ALL workers switch
+    to the new model (POST /model/reload only reaches one of them).
+    A change is only acted on once the file has stayed the same for one
+    full interval, so a file that is still being written isn't loaded.
+    """
+    loop = asyncio.get_running_loop()
+    previous = model_file_signature()
+    
+    while True:
+        await asyncio.sleep(config.MODEL_CHECK_INTERVAL)
+        signature = model_file_signature()
+        
+        if signature is not None and signature == previous \
+                and signature != loaded_model_signature:
+            print("🔁 Model file changed - reloading")
+            await loop.run_in_executor(None, load_trained_model)
+        
+        previous = signature
+
+
+def run_model(images, state):
+    """
+    Run a batch of preprocessed images through the model
+    Uses the ONNX Runtime session when available, the compiled Keras
+    forward pass otherwise
+    
+    Parameters:
+    -----------
+    images : numpy array
+        float32 batch of shape (N, 128, 128, 1)
+        Reshaped (no copy) to the loaded model's input shape
+    state : dict
+        Serving state of the model to use (see build_serving_state)
+    
+    Returns:
+    --------
+    embeddings : numpy array
+        Signature embeddings of shape (N, 64)
+    probabilities : numpy array
+        Genuine probabilities of shape (N, 1)
+    """
+    images = images.reshape((len(images),) + state["input_shape"])
+    
+    session = state["onnx_session"]
+    if session is not None:
+        embeddings, probabilities = session.run(None, {state["onnx_input_name"]: images})
+    else:
+        count = len(images)
+        
+        # Pad up to a pre-compiled batch size (see BATCH_BUCKETS)
+        if config.JIT_COMPILE:
+            bucket = next(size for size in BATCH_BUCKETS if size >= count)
+            if bucket != count:
+                padded = np.zeros((bucket,) + images.shape[1:], dtype=np.float32)
+                padded[:count] = images
+                images = padded
+        
+        embeddings, probabilities = state["serving_fn"](images)
+        embeddings, probabilities = embeddings.numpy()[:count], probabilities.numpy()[:count]
+    
+    return embeddings, probabilities
+
+
+def warm_up_model(state):
+    """
+    Run a few throwaway predictions so the first real request doesn't pay
+    for graph tracing, kernel selection and memory allocation
+    Warms up every batch size in BATCH_BUCKETS (each one is a separate
+    XLA compilation)
+    
+    Parameters:
+    -----------
+    state : dict
+        Serving state of the model to warm up
+    """
+    try:
+        for batch_size in BATCH_BUCKETS:
+            dummy = np.zeros((batch_size,) + config.INPUT_SHAPE, dtype=np.float32)
+            for _ in range(config.WARMUP_RUNS):
+                run_model(dummy, state)
+        print(f"🔥 Model warmed up ({config.WARMUP_RUNS} runs per batch size)")
+        
     except Exception as e:
-        print(f"❌ Error loading model: {str(e)}")
-        loaded_model = None
+        print(f"⚠️  Warm-up failed: {str(e)}")
+
+
+def get_cached_prediction(cache, cache_key):
+    """
+    Look up a previous result for the same upload
+    
+    Parameters:
+    -----------
+    cache : OrderedDict
+        Prediction cache of the current model
+    cache_key : bytes
+        Hash of the raw upload bytes
+    
+    Returns:
+    --------
+    result : tuple or None
+        Cached (probability, embedding), None on a cache miss
+    """
+    result = cache.get(cache_key)
+    
+    if result is None:
+        cache_stats["misses"] += 1
+        return None
+    
+    # Mark as most recently used
+    cache.move_to_end(cache_key)
+    cache_stats["hits"] += 1
+    return result
+
+
+def store_cached_prediction(cache, cache_key, result):
+    """
+    Remember a result, evicting the least recently used one when full
+    """
+    cache[cache_key] = result
+    
+    if len(cache) > config.PREDICTION_CACHE_SIZE:
+        cache.popitem(last=False)
 
 
 def preprocess_signature(image_bytes):
@@ -79,33 +576,198 @@ def preprocess_signature(image_bytes):
         Preprocessed image ready for model
     """
     
-    # Convert bytes to numpy array
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    
-    # Decode image
-    img = cv2.imdecode(nparr, 0)
+    # Decode image (libjpeg-turbo fast path for JPEGs)
+    img = data_preprocessing.decode_grayscale(image_bytes)
     
     if img is None:
         raise ValueError("Could not decode image")
     
-    # Resize to model input size
-    img = cv2.resize(img, config.IMAGE_SIZE)  # type: ignore
+    # Resize to model input size (into this thread's reusable buffer)
+    img = data_preprocessing.resize_signature(img)
     
-    # Normalize pixel values (0-255 → 0-1)
-    img = img / 255.0
+    # Normalize pixel values (0-255 → 0-1) straight into a float32 array
+    # that already has the batch and channel dimensions the model expects
+    # (one pass over the pixels, no float64 temporary)
+    # This one stays a fresh array per request: it waits in the batching
+    # queue, so a reused buffer would be overwritten by the next request
+    processed = np.empty((1,) + config.INPUT_SHAPE, dtype=np.float32)
+    np.multiply(img, data_preprocessing.PIXEL_SCALE, out=processed[0, :, :, 0], dtype=np.float32)
+    
+    return processed
+
+
+async def run_batch(batch, slots):
+    """
+    Run one batch through the model on the prediction thread pool
     
-    # Reshape for model input (add batch and channel dimensions)
-    img = img.reshape(1, config.INPUT_SHAPE[0], config.INPUT_SHAPE[1], config.INPUT_SHAPE[2])
+    Parameters:
+    -----------
+    batch : list
+        List of (processed_image, future) pairs
+    slots : asyncio.Semaphore
+        Released once the batch is done so the worker can send the next one
+    """
+    futures = [future for _, future in batch]
     
-    return img
+    # The whole batch uses the model that is current now, even if a
+    # reload swaps in a new one while it runs
+    state = serving_state
+    
+    try:
+        if state is None:
+            raise RuntimeError("Model not loaded")
+        
+        # Stack images into one (N, 128, 128, 1) batch
+        images = np.stack([image[0] for image, _ in batch])
+        
+        # predict() blocks, so run it off the event loop
+        embeddings, probabilities = await asyncio.get_running_loop().run_in_executor(
+            PREDICT_POOL, run_model, images, state
+        )
+        
+    except Exception as e:
+        for future in futures:
+            if not future.done():
+                future.set_exception(e)
+        return
+    
+    finally:
+        slots.release()
+    
+    # Fan results back out to the waiting requests
+    for future, probability, embedding in zip(futures, probabilities[:, 0], embeddings):
+        if not future.done():
+            future.set_result((float(probability), embedding))
+
+
+async def batch_prediction_worker():
+    """
+    Background task that groups queued images into batches
+    
+    Waits for the first queued image, then keeps collecting images until
+    MAX_BATCH_SIZE is reached or BATCH_TIMEOUT_MS has passed. The whole
+    batch goes through a single model.predict() call and each waiting
+    request gets its own (probability, embedding) back through its future.
+    At most PREDICT_THREADS batches run at once; while they are busy,
+    new requests keep piling up in the queue for the next batch.
+    """
+    loop = asyncio.get_running_loop()
+    timeout = config.BATCH_TIMEOUT_MS / 1000.0
+    slots = asyncio.Semaphore(config.PREDICT_THREADS)
+    
+    while True:
+        await slots.acquire()
+        
+        batch = [await prediction_queue.get()]
+        deadline = loop.time() + timeout
+        
+        # Collect more requests until the batch is full or time runs out
+        while len(batch) < config.MAX_BATCH_SIZE:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(prediction_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        task = asyncio.create_task(run_batch(batch, slots))
+        running_batches.add(task)
+        task.add_done_callback(running_batches.discard)
+
+
+async def predict_batched(processed_image):
+    """
+    Queue a preprocessed image for batched prediction
+    
+    Parameters:
+    -----------
+    processed_image : numpy array
+        Image of shape (1, 128, 128, 1) from preprocess_signature()
+    
+    Returns:
+    --------
+    probability : float
+        Genuine probability predicted by the model
+    embedding : numpy array
+        Signature embedding (last hidden layer activations)
+    """
+    future = asyncio.get_running_loop().create_future()
+    await prediction_queue.put((processed_image, future))
+    return await future
+
+
+async def analyze_signature(image_bytes):
+    """
+    Get the genuine probability and embedding of an uploaded image
+    Repeat uploads are answered from the cache without touching the model
+    
+    Parameters:
+    -----------
+    image_bytes : bytes
+        Raw image bytes from upload
+    
+    Returns:
+    --------
+    probability : float
+        Genuine probability predicted by the model
+    embedding : numpy array
+        Signature embedding (last hidden layer activations)
+    """
+    state = serving_state
+    if state is None:
+        raise RuntimeError("Model not loaded")
+    
+    # Same image uploaded before? Skip decoding and prediction entirely
+    cache = state["cache"]
+    cache_key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+    result = get_cached_prediction(cache, cache_key)
+    
+    if result is None:
+        # Preprocess image (decode/resize in a thread, off the event loop)
+        loop = asyncio.get_running_loop()
+        processed_image = await loop.run_in_executor(None, preprocess_signature, image_bytes)
+        
+        # Make prediction (batched with other in-flight requests)
+        result = await predict_batched(processed_image)
+        store_cached_prediction(cache, cache_key, result)
+    
+    return result
+
+
+def cosine_similarity(a, b):
+    """
+    Cosine similarity between two embeddings (0 if either is all zeros)
+    """
+    norm = np.linalg.norm(a) * np.linalg.norm(b)
+    if norm == 0:
+        return 0.0
+    return float(np.dot(a, b) / norm)
 
 
 @app.on_event("startup")
 async def startup_event():
     """
-    Load model when server starts
+    Load model and start the batching worker when server starts
     """
+    global prediction_queue, batch_worker_task, model_watch_task
+    
+    # One TensorFlow/OpenCV thread per worker process to avoid oversubscribing cores
+    if RUNNING_WORKERS > 1:
+        cv2.setNumThreads(1)
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(1)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError as e:
+            print(f"⚠️  Could not limit TensorFlow threads: {str(e)}")
+    
     load_trained_model()
+    
+    prediction_queue = asyncio.Queue()
+    batch_worker_task = asyncio.create_task(batch_prediction_worker())
+    
+    if config.MODEL_CHECK_INTERVAL:
+        model_watch_task = asyncio.create_task(watch_model_file())
 
 
 @app.get("/")
@@ -117,10 +779,11 @@ async def root():
         "message": "Signature Verification API",
         "version": "1.0.0",
         "status": "active",
-        "model_loaded": loaded_model is not None,
+        "model_loaded": serving_state is not None,
         "endpoints": {
             "health": "/health",
             "predict": "/predict",
+            "predict_tensor": "/predict/tensor",
             "verify": "/verify",
             "model_info": "/model/info"
         }
@@ -135,7 +798,57 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "model_loaded": loaded_model is not None
+        "model_loaded": serving_state is not None
+    }
+
+
+async def read_upload(file):
+    """
+    Read an uploaded file, refusing files larger than MAX_UPLOAD_BYTES (HTTP 413)
+    Reads at most one byte past the limit, however large the file is
+    """
+    image_bytes = await file.read(config.MAX_UPLOAD_BYTES + 1)
+    
+    if len(image_bytes) > config.MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"File too large (max {config.MAX_UPLOAD_BYTES} bytes)"
+        )
+    
+    return image_bytes
+
+
+def validate_image_bytes(image_bytes):
+    """
+    Reject uploads that aren't a supported image format (HTTP 400)
+    """
+    if data_preprocessing.detect_image_format(image_bytes) is None:
+        raise HTTPException(
+            status_code=400,
+            detail="File must be an image (PNG, JPG, JPEG, BMP, TIFF or WEBP)"
+        )
+
+
+def build_prediction_response(prediction_prob):
+    """
+    Build the /predict JSON payload from a genuine probability
+    """
+    prediction_prob = float(prediction_prob)
+    probability = round(prediction_prob, 4)
+    
+    # Determine class
+    is_genuine = prediction_prob >= config.CONFIDENCE_THRESHOLD
+    
+    return {
+        "prediction": "GENUINE" if is_genuine else "FORGED",
+        "confidence": round(prediction_prob * 100, 2),
+        "probability": probability,
+        "threshold": config.CONFIDENCE_THRESHOLD,
+        "details": {
+            "genuine_probability": probability,
+            "forged_probability": round(1 - prediction_prob, 4)
+        },
+        "timestamp": datetime.now().isoformat()
     }
 
 
@@ -155,50 +868,24 @@ async def predict_signature(file: UploadFile = File(...)):
     """
     
     # Check if model is loaded
-    if loaded_model is None:
+    if serving_state is None:
         raise HTTPException(
             status_code=503,
             detail="Model not loaded. Please train a model first."
         )
     
-    # Validate file type
-    if not file.content_type.startswith('image/'):
-        raise HTTPException(
-            status_code=400,
-            detail="File must be an image (PNG, JPG, JPEG, etc.)"
-        )
+    # Read image file (size-capped)
+    image_bytes = await read_upload(file)
+    
+    # Validate file type from the file's own magic bytes
+    validate_image_bytes(image_bytes)
     
     try:
-        # Read image file
-        image_bytes = await file.read()
-        
-        # Preprocess image
-        processed_image = preprocess_signature(image_bytes)
+        # Make prediction (cached, or batched with other in-flight requests)
+        prediction_prob, _ = await analyze_signature(image_bytes)
         
-        # Make prediction
-        prediction_prob = loaded_model.predict(processed_image, verbose=0)[0][0]
-        
-        # Convert to percentage
-        confidence = float(prediction_prob * 100)
-        
-        # Determine class
-        is_genuine = prediction_prob >= config.CONFIDENCE_THRESHOLD
-        predicted_class = "GENUINE" if is_genuine else "FORGED"
-        
-        # Prepare response
-        response = {
-            "prediction": predicted_class,
-            "confidence": round(confidence, 2),
-            "probability": round(float(prediction_prob), 4),
-            "threshold": config.CONFIDENCE_THRESHOLD,
-            "details": {
-                "genuine_probability": round(float(prediction_prob), 4),
-                "forged_probability": round(float(1 - prediction_prob), 4)
-            },
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        return JSONResponse(content=response)
+        # Returning the response directly skips FastAPI's jsonable_encoder pass
+        return FastJSONResponse(content=build_prediction_response(prediction_prob))
         
     except ValueError as ve:
         raise HTTPException(status_code=400, detail=str(ve))
@@ -210,6 +897,73 @@ async def predict_signature(file: UploadFile = File(...)):
         )
 
 
+@app.post("/predict/tensor")
+async def predict_tensor(request: Request):
+    """
+    Predict from an already preprocessed image (for trusted clients)
+    
+    Skips all server-side decoding, resizing and normalization.
+    
+    Wire format (request body, Content-Type: application/octet-stream):
+    - 128 x 128 x 1 float32 values, little-endian, row-major (65,536 bytes)
+    - Pixels already normalized to 0-1 (grayscale / 255), no header
+    - NaN / infinite values are rejected (400)
+    
+    Example (Python client):
+        body = (gray_128x128.astype('<f4') / 255).tobytes()
+    
+    Returns:
+    --------
+    JSON response with prediction and confidence (same as /predict)
+    """
+    
+    if serving_state is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Model not loaded. Please train a model first."
+        )
+    
+    # Stream the body and stop as soon as it's too long
+    # (a chunked request has no Content-Length for the middleware to check)
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > TENSOR_BODY_BYTES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Body too large (must be {TENSOR_BODY_BYTES} bytes)"
+            )
+    
+    if len(body) != TENSOR_BODY_BYTES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Body must be {TENSOR_BODY_BYTES} bytes "
+                   f"({config.INPUT_SHAPE} float32), got {len(body)}"
+        )
+    
+    # Zero-copy view of the body as a (1, 128, 128, 1) batch
+    processed_image = np.frombuffer(body, dtype='<f4').reshape((1,) + config.INPUT_SHAPE)
+    
+    # NaN/inf pixels would come back as a null probability ("FORGED")
+    if not np.isfinite(processed_image).all():
+        raise HTTPException(
+            status_code=400,
+            detail="Body contains NaN or infinite values"
+        )
+    
+    try:
+        # Make prediction (batched with other in-flight requests)
+        prediction_prob, _ = await predict_batched(processed_image)
+        
+        return FastJSONResponse(content=build_prediction_response(prediction_prob))
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Prediction error: {str(e)}"
+        )
+
+
 @app.post("/verify")
 async def verify_signature(
     reference: UploadFile = File(..., description="Reference signature (genuine)"),
@@ -230,34 +984,37 @@ async def verify_signature(
     JSON response with verification result
     """
     
-    if loaded_model is None:
+    if serving_state is None:
         raise HTTPException(
             status_code=503,
             detail="Model not loaded. Please train a model first."
         )
     
+    # Read both images (size-capped)
+    ref_bytes = await read_upload(reference)
+    test_bytes = await read_upload(test)
+    
+    # Validate file types from the files' own magic bytes
+    validate_image_bytes(ref_bytes)
+    validate_image_bytes(test_bytes)
+    
     try:
-        # Read both images
-        ref_bytes = await reference.read()
-        test_bytes = await test.read()
-        
-        # Preprocess both
-        ref_processed = preprocess_signature(ref_bytes)
-        test_processed = preprocess_signature(test_bytes)
-        
-        # Get predictions for both
-        ref_pred = loaded_model.predict(ref_processed, verbose=0)[0][0]
-        test_pred = loaded_model.predict(test_processed, verbose=0)[0][0]
+        # Get prediction + embedding for both (processed concurrently so
+        # they share a batch; a previously seen reference comes from cache)
+        (ref_pred, ref_embedding), (test_pred, test_embedding) = await asyncio.gather(
+            analyze_signature(ref_bytes),
+            analyze_signature(test_bytes)
+        )
         
         # Check if both are genuine
         ref_is_genuine = ref_pred >= config.CONFIDENCE_THRESHOLD
         test_is_genuine = test_pred >= config.CONFIDENCE_THRESHOLD
         
-        # Calculate similarity (simple approach)
-        similarity = 1 - abs(ref_pred - test_pred)
+        # Similarity of the two signatures' embeddings (not just their scores)
+        similarity = cosine_similarity(ref_embedding, test_embedding)
         
         # Verification logic
-        match = ref_is_genuine and test_is_genuine and similarity > 0.85
+        match = bool(ref_is_genuine and test_is_genuine and similarity > config.SIMILARITY_THRESHOLD)
         
         response = {
             "match": match,
@@ -274,7 +1031,7 @@ async def verify_signature(
             "timestamp": datetime.now().isoformat()
         }
         
-        return JSONResponse(content=response)
+        return FastJSONResponse(content=response)
         
     except Exception as e:
         raise HTTPException(
@@ -289,57 +1046,49 @@ async def get_model_info():
     Get information about the loaded model
     """
     
-    if loaded_model is None:
+    state = serving_state
+    if state is None:
         return {
             "status": "no_model",
             "message": "No model is currently loaded"
         }
     
-    try:
-        # Get model summary
-        total_params = loaded_model.count_params()
-        
-        # Get layer info
-        layers_info = []
-        for layer in loaded_model.layers:
-            layers_info.append({
-                "name": layer.name,
-                "type": layer.__class__.__name__,
-                "output_shape": str(layer.output_shape)
-            })
-        
-        return {
-            "status": "loaded",
-            "architecture": {
-                "input_shape": config.INPUT_SHAPE,
-                "total_parameters": int(total_params),
-                "layers": layers_info
-            },
-            "configuration": {
-                "image_size": config.IMAGE_SIZE,
-                "confidence_threshold": config.CONFIDENCE_THRESHOLD
-            }
-        }
-        
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": str(e)
+    # Architecture summary was computed once when the model was loaded
+    return {
+        "status": "loaded",
+        "architecture": state["info"],
+        "configuration": {
+            "image_size": config.IMAGE_SIZE,
+            "confidence_threshold": config.CONFIDENCE_THRESHOLD
+        },
+        "cache_stats": {
+            "size": len(state["cache"]),
+            "max_size": config.PREDICTION_CACHE_SIZE,
+            "hits": cache_stats["hits"],
+            "misses": cache_stats["misses"]
         }
+    }
 
 
 @app.post("/model/reload")
 async def reload_model():
     """
     Reload the model (useful after retraining)
+    
+    With several workers only the worker that receives this request
+    reloads right away; the others pick up a changed model file within
+    MODEL_CHECK_INTERVAL seconds (see watch_model_file)
     """
     try:
-        load_trained_model()
+        # Conversion + warm-up take a while - keep the event loop serving
+        # (the old model answers requests until the new one is ready)
+        loaded = await asyncio.get_running_loop().run_in_executor(None, load_trained_model)
         
-        if loaded_model is None:
+        if not loaded:
             return {
                 "status": "failed",
                 "message": "Could not load model"
+                           + (" (still serving the previous one)" if serving_state is not None else "")
             }
         
         return {
@@ -366,11 +1115,19 @@ if __name__ == "__main__":
     print(f"\n📖 API Documentation:")
     print(f"   Swagger UI: http://localhost:8000/docs")
     print(f"   ReDoc:      http://localhost:8000/redoc")
+    print(f"\n⚙️  Workers: {config.SERVER_WORKERS}")
     print("\n" + "="*60 + "\n")
     
+    # Tell the worker processes how many of them there are
+    # (they inherit the environment), so they can share the CPU cores
+    os.environ["WEB_CONCURRENCY"] = str(config.SERVER_WORKERS)
+    
+    # Multiple workers need the app as an import string so each
+    # process can import it (and load its own model) on its own
     uvicorn.run(
-        app,
+        "app:app",
         host="0.0.0.0",
         port=8000,
+        workers=config.SERVER_WORKERS,
         log_level="info"
     )
\ No newline at end of file
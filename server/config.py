@@ -28,6 +28,10 @@ VALIDATION_DIR = os.path.join(DATA_DIR, 'validation')
 # Where validation images are stored
 # Example: .../server/data/validation/
 
+DATASET_DIR = os.path.join(BASE_DIR, 'Dataset')
+# Where the raw signature dataset (one folder per user) is stored
+# Example: .../server/Dataset/
+
 SAVED_MODELS_DIR = os.path.join(BASE_DIR, 'saved_models')
 # Where trained models will be saved
 # Example: .../server/saved_models/
@@ -52,6 +56,16 @@ INPUT_SHAPE = (128, 128, 1)
 # This is what the neural network expects as input
 # 128 x 128 x 1 = 16,384 pixels
 
+INPUT_DIM = INPUT_SHAPE[0] * INPUT_SHAPE[1] * INPUT_SHAPE[2]
+# Length of one flattened image = 16,384 values
+# The network takes images already flattened to this length
+# (flattened once before training instead of on every training step)
+
+
+LOADER_THREADS = os.cpu_count() or 1
+# Number of threads used to read and resize dataset images in parallel
+# One per CPU core by default
+
 
 # Training/Validation/Test Split percentages
 TRAIN_SPLIT = 0.7       # 70% of data for training
@@ -77,6 +91,12 @@ HIDDEN_LAYER_3 = 64
 # Notice the pattern: 256 → 128 → 64 (decreasing)
 # This "funnels" information from 16,384 inputs to 1 output
 
+LOW_RANK_DIM = 64
+# Size of a small linear "projection" layer placed before Hidden Layer 1
+# 16,384 → 256 directly = 4,194,304 weights (>99% of the whole model!)
+# 16,384 → 64 → 256    = 1,064,960 weights (~4x fewer, ~4x less math)
+# 0 = no projection (original architecture)
+
 
 # Activation functions (we learned these!)
 HIDDEN_ACTIVATION = 'relu'
@@ -88,6 +108,8 @@ OUTPUT_ACTIVATION = 'sigmoid'
 # Sigmoid for output layer
 # Sigmoid(x) = 1 / (1 + e^(-x))
 # Gives output between 0 and 1 (perfect for probability!)
+# During training the output layer outputs the raw x ("logit") and the
+# sigmoid is fused into the loss; it's added back for predictions/exports
 
 
 # ==================== TRAINING HYPERPARAMETERS ====================
@@ -109,6 +131,23 @@ BATCH_SIZE = 32
 # Larger = faster but less precise
 # Smaller = slower but more precise
 
+AUTO_TUNE_BATCH = False
+# True = train.py times the model at several batch sizes and replaces
+# BATCH_SIZE with the fastest one for this computer (result is cached)
+# Note: a different batch size can change how training converges
+# Off by default: on small datasets BATCH_SIZE = 32 trains best
+
+MIN_STEPS_PER_EPOCH = 20
+# The auto-tuner never picks a batch size with fewer weight updates
+# (batches) per epoch than this
+# Example: 700 training images → batch size at most 32 (700 // 32 = 21)
+
+BATCH_SIZE_CANDIDATES = (32, 64, 128, 256, 512)
+# Batch sizes tried by the auto-tuner (powers of 2 suit the CPU/GPU best)
+
+AUTO_TUNE_RUNS = 10
+# Timed forward passes per candidate batch size
+
 EPOCHS = 50
 # How many times to go through the ENTIRE dataset
 # 1 epoch = see all training images once
@@ -121,6 +160,51 @@ EARLY_STOPPING_PATIENCE = 10
 # Prevents the network from "memorizing" instead of "learning"
 
 
+# ==================== CPU THREADING ====================
+# How TensorFlow spreads the math over CPU cores
+# (train.py uses these as-is; app.py drops to 1 thread per worker when
+# several workers share the machine)
+
+INTRA_OP_THREADS = max(1, (os.cpu_count() or 2) // 2)
+# Threads used INSIDE one operation (e.g. one big matrix multiply)
+# Half the logical cores = one per physical core (hyper-threads don't
+# help for dense math, they just compete for the same core)
+
+INTER_OP_THREADS = 2
+# Independent operations that can run at the same time
+# Our network is a simple chain of layers, so 2 is plenty
+
+CPU_ENV_VARS = {
+    'TF_ENABLE_ONEDNN_OPTS': '1',                      # Intel oneDNN kernels
+    'KMP_AFFINITY': 'granularity=fine,compact,1,0',    # Pin threads to cores
+    'KMP_BLOCKTIME': '1',                              # Idle threads sleep after 1 ms
+    'OMP_NUM_THREADS': str(INTRA_OP_THREADS),
+    'TF_NUM_INTRAOP_THREADS': str(INTRA_OP_THREADS),
+    'TF_NUM_INTEROP_THREADS': str(INTER_OP_THREADS),
+}
+# Environment variables set before TensorFlow is imported
+# Values already set in your shell win (so you can still override them)
+
+
+# ==================== PRECISION ====================
+# Number format used for the network's weights and math
+
+PRECISION = 'float32'
+# 'float32'         = full precision everywhere (works on every machine)
+# 'mixed_bfloat16'  = bfloat16 math, float32 weights - ~2x faster on CPUs
+#                     with AVX-512 BF16 / AMX (recent Xeons) and on TPUs
+# 'mixed_float16'   = float16 math - ~2x faster on NVIDIA GPUs (tensor cores)
+# Mixed precision is SLOWER on CPUs without native bfloat16 support,
+# so only switch it on for hardware that has it
+# The output layer always stays float32 for a stable loss
+
+JIT_COMPILE = True
+# True = compile training and inference with XLA (TensorFlow's compiler)
+# XLA fuses each layer's MatMul + bias + ReLU into a single kernel,
+# so activations aren't written to and re-read from memory between ops
+# The first epoch / prediction is slower while XLA compiles
+
+
 # ==================== OPTIMIZER ====================
 # Algorithm used for gradient descent (updating weights)
 
@@ -141,11 +225,13 @@ LOSS_FUNCTION = 'binary_crossentropy'
 # Class 1 = Genuine
 # Measures the difference between predicted and actual
 # Lower loss = better predictions
+# Computed from logits (from_logits=True) - more stable than sigmoid + log
 
 
 # ==================== METRICS ====================
 # What to track during training
-# NOTE: Only use 'accuracy' as string. Precision and Recall are added as objects in model.py
+# NOTE: Accuracy, Precision and Recall are all built as objects in model.py
+# (they must threshold the model's logits at 0 instead of probabilities at 0.5)
 
 METRICS = ['accuracy']
 # Accuracy = % of correct predictions
@@ -164,6 +250,131 @@ CONFIDENCE_THRESHOLD = 0.5
 # Output = 0.87 → 0.87 >= 0.5 → GENUINE
 # Output = 0.23 → 0.23 < 0.5 → FORGED
 
+SIMILARITY_THRESHOLD = 0.85
+# Minimum similarity for /verify to accept a test signature
+# Similarity = cosine similarity of the two signatures' embeddings
+# (the 64 activations of the last hidden layer), between 0 and 1
+#
+# ⚠️ NOT CALIBRATED - 0.85 is a placeholder, not a measured value:
+# - The embeddings come after a ReLU, so they are never negative and the
+#   cosine similarity is always between 0 and 1 - and usually high, even
+#   for two different people's signatures
+# - The network was trained to tell genuine from forged, NOT to tell one
+#   signer from another, so similarity says little about "same person"
+# Before relying on /verify, compute the similarity for known same-signer
+# and different-signer pairs from your own data and pick the cut-off there
+
+
+# ==================== SERVER WORKERS ====================
+# How many processes uvicorn starts to serve the API
+
+SERVER_WORKERS = int(os.getenv('WORKERS', os.cpu_count() or 1))
+# Used when starting the server with `python app.py`
+# Each worker is a separate process with its own copy of the model
+# Defaults to one worker per CPU core, override with the WORKERS env variable
+# With more than 1 worker, TensorFlow is limited to 1 thread per worker
+# so the workers don't fight over the same cores
+# Started another way (uvicorn / gunicorn directly), the worker count is read
+# from WEB_CONCURRENCY - set it yourself, e.g. `WEB_CONCURRENCY=4 uvicorn app:app`
+# (`uvicorn app:app --workers 4` alone does NOT set it, so each worker would
+# think it is alone and use all cores). Unset = a single process, all cores
+
+MODEL_CHECK_INTERVAL = 5
+# Seconds between checks for a new model file (saved_models/signature_model_latest.keras)
+# When train.py saves a new model, every worker reloads it automatically
+# (POST /model/reload only reloads the ONE worker that received the request)
+# 0 = never check
+
+
+# ==================== UPLOAD LIMITS ====================
+# Protect the server from huge uploads (memory exhaustion)
+
+MAX_UPLOAD_BYTES = 5_000_000
+# Largest image file accepted (5 MB) - bigger files get HTTP 413
+# Signature scans are normally well under 1 MB
+
+MAX_REQUEST_BYTES = 2 * MAX_UPLOAD_BYTES + 1_000_000
+# Largest request body accepted, checked from the Content-Length header
+# Room for the two images of /verify plus form-data overhead
+
+
+# ==================== SERVER BATCHING ====================
+# How the API groups concurrent requests into one model call
+
+MAX_BATCH_SIZE = 16
+# Maximum number of images sent to the model in a single predict() call
+# Requests arriving at the same time are stacked into one batch
+# Larger = better throughput under load, but more memory per call
+
+BATCH_TIMEOUT_MS = 10
+# How long (in milliseconds) to wait for more requests before running a batch
+# A lone request waits at most this long before being predicted
+# 10 ms is small compared to a full request round trip
+
+PREDICT_THREADS = 2
+# Number of threads that run model.predict() in the background
+# Keeps the server responsive (file uploads, health checks) while predicting
+# Also the number of batches that can be predicted at the same time
+
+
+# ==================== SERVER INFERENCE ====================
+# Which runtime the API uses to run the model
+
+USE_ONNX_RUNTIME = True
+# True = convert the Keras model to ONNX at startup and serve with ONNX Runtime
+# ONNX Runtime runs fused, graph-optimized kernels (much faster on CPU)
+# Falls back to Keras predict() if onnxruntime/tf2onnx aren't installed
+
+ONNX_OPSET = 17
+# ONNX operator set version used for the conversion
+
+QUANTIZE_INT8 = True
+# True = quantize the ONNX model's weights to int8 at startup
+# 4x smaller weights (float32 → int8) and faster int8 matrix math on CPU
+# Accuracy is usually unchanged for this model; set False to serve float32
+
+WARMUP_RUNS = 3
+# Throwaway predictions run right after the model is loaded
+# The first calls are slow (graph tracing, kernel selection), so we pay
+# that cost at startup instead of on the first user's request
+
+PREDICTION_CACHE_SIZE = 10000
+# How many recent /predict results to remember (keyed by a hash of the upload)
+# Re-uploading the exact same image returns the cached result instantly
+# Also used by /verify, so a reused reference signature isn't predicted again
+# Each entry (probability + 64-value embedding) costs well under 1 KB
+
+
+# ==================== MODEL EXPORT ====================
+# Extra formats written by model.save_model()
+
+LEGACY_H5 = False
+# Also save the full model in the old H5 format (<name>.h5)
+# It holds exactly the same data as the .keras file, so it's off by default
+# Turn on only for tools that can't read .keras files
+
+SAVE_TFLITE_INT8 = True
+# Also save an INT8-quantized TensorFlow Lite model (<name>_int8.tflite)
+# 4x smaller than float32 and faster on CPUs with int8 instructions (VNNI)
+# Handy for mobile / edge deployment
+
+SAVE_TENSORRT = True
+# Also save a TensorRT-optimized SavedModel (<name>_trt/) for GPU inference
+# TensorRT fuses layers and picks the fastest CUDA kernels for your GPU
+# Skipped automatically on machines without an NVIDIA GPU
+
+TENSORRT_PRECISION = 'FP16'
+# Precision of the TensorRT engine: 'FP32', 'FP16' or 'INT8'
+# FP16 uses the GPU's tensor cores - about 2x faster than FP32
+# INT8 is calibrated on a sample of the training images (train.py passes
+# them in); it is skipped when no sample is given
+
+SAVE_FUSED_INFER = True
+# Also save a fused, XLA-compiled inference-only SavedModel (<name>_fused/)
+# The layers are rewritten as plain matmuls so each Dense + bias + ReLU
+# runs as a single kernel - load with tf.saved_model.load(path).infer(x)
+# Takes flattened images (N, 16384) and returns probabilities (N, 1)
+
 
 # ==================== RANDOM SEED ====================
 # For reproducibility (get same results every time)
@@ -178,30 +389,51 @@ RANDOM_SEED = 42
 # ==================== VERBOSITY ====================
 # How much information to print during training
 
-VERBOSE = 1
+VERBOSE = 2
 # 0 = Silent (no output)
-# 1 = Progress bar (recommended)
-# 2 = One line per epoch
+# 1 = Progress bar (redrawn after EVERY batch - slows down fast training)
+# 2 = One line per epoch (recommended)
+
+VERBOSE_LOGGING = True
+# True = print the decorative banners and summaries around training
+# Set False for tight retraining loops (e.g. hyperparameter search)
+
+
+# ==================== PLOTTING ====================
+# Training history plots saved by train.py
+
+PLOT_DPI = 100
+# Resolution of the saved plot image (dots per inch)
+# 100 is fine on screen; 300 = print quality but ~9x more pixels to render
+
+INTERACTIVE_PLOTS = False
+# False = only save plots to a file (works on servers without a screen)
+#         and draw them in the background while the model is evaluated
+# True  = also open the plots in a window (blocks until you close it)
 
 
 # ==================== PRINT CONFIGURATION (for verification) ====================
-print("=" * 60)
-print("✓ Configuration loaded successfully!")
-print("=" * 60)
-print(f"Image Settings:")
-print(f"  - Image Size: {IMAGE_SIZE}")
-print(f"  - Channels: {CHANNELS} (Grayscale)")
-print(f"  - Input Shape: {INPUT_SHAPE}")
-print(f"\nNetwork Architecture:")
-print(f"  - Hidden Layer 1: {HIDDEN_LAYER_1} neurons")
-print(f"  - Hidden Layer 2: {HIDDEN_LAYER_2} neurons")
-print(f"  - Hidden Layer 3: {HIDDEN_LAYER_3} neurons")
-print(f"  - Total: 16,384 → {HIDDEN_LAYER_1} → {HIDDEN_LAYER_2} → {HIDDEN_LAYER_3} → 1")
-print(f"\nTraining Settings:")
-print(f"  - Learning Rate: {LEARNING_RATE}")
-print(f"  - Batch Size: {BATCH_SIZE}")
-print(f"  - Epochs: {EPOCHS}")
-print(f"  - Optimizer: {OPTIMIZER}")
-print(f"\nPrediction:")
-print(f"  - Threshold: {CONFIDENCE_THRESHOLD}")
-print("=" * 60)
\ No newline at end of file
+# Only when run directly (python config.py), so importing config stays silent
+if __name__ == "__main__":
+    print("=" * 60)
+    print("✓ Configuration loaded successfully!")
+    print("=" * 60)
+    print(f"Image Settings:")
+    print(f"  - Image Size: {IMAGE_SIZE}")
+    print(f"  - Channels: {CHANNELS} (Grayscale)")
+    print(f"  - Input Shape: {INPUT_SHAPE}")
+    print(f"  - Input Dim: {INPUT_DIM} (flattened)")
+    print(f"\nNetwork Architecture:")
+    print(f"  - Hidden Layer 1: {HIDDEN_LAYER_1} neurons")
+    print(f"  - Hidden Layer 2: {HIDDEN_LAYER_2} neurons")
+    print(f"  - Hidden Layer 3: {HIDDEN_LAYER_3} neurons")
+    print(f"  - Low-Rank Projection: {LOW_RANK_DIM or 'off'}")
+    print(f"  - Total: 16,384 → {HIDDEN_LAYER_1} → {HIDDEN_LAYER_2} → {HIDDEN_LAYER_3} → 1")
+    print(f"\nTraining Settings:")
+    print(f"  - Learning Rate: {LEARNING_RATE}")
+    print(f"  - Batch Size: {BATCH_SIZE}")
+    print(f"  - Epochs: {EPOCHS}")
+    print(f"  - Optimizer: {OPTIMIZER}")
+    print(f"\nPrediction:")
+    print(f"  - Threshold: {CONFIDENCE_THRESHOLD}")
+    print("=" * 60)
\ No newline at end of file
@@ -4,12 +4,272 @@ Loads images, preprocesses them, and prepares them for training
 """
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import cv2
 from sklearn.model_selection import train_test_split
 import config
 
-def load_images_from_folder(folder_path, label):
+# libjpeg-turbo decoder (optional - much faster JPEG decoding than OpenCV)
+# Falls back to cv2.imdecode if PyTurboJPEG or the native library is missing
+try:
+    from turbojpeg import TurboJPEG, TJPF_GRAY
+    turbo = TurboJPEG()
+except (ImportError, OSError, RuntimeError):
+    turbo = None
+
+# File signatures ("magic bytes") of the image formats we accept
+IMAGE_MAGIC = {
+    'jpeg': (b'\xff\xd8\xff',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'bmp': (b'BM',),
+    'tiff': (b'II*\x00', b'MM\x00*'),
+}
+
+# Multiplier that maps uint8 pixels (0-255) to 0-1
+PIXEL_SCALE = np.float32(1.0 / 255.0)
+
+# Per-thread scratch buffers, reused across images to avoid re-allocating
+_thread_buffers = threading.local()
+
+# Sub-folders (lowercase) that may hold each class, in order of preference
+# ('genuine/images' beats 'genuine_images', which beats a flat 'genuine')
+GENUINE_FOLDER_NAMES = ['genuine/images', 'genuine_images', 'genuine']
+FORGED_FOLDER_NAMES = ['skilled forgery/images', 'skilled_forgery/images',
+                       'skilled_forgery_images', 'forged_images', 'forged/images',
+                       'skilled forgery', 'skilled_forgery']
+
+
+def detect_image_format(image_bytes):
+    """
+    Identify an image format from its first bytes
+    (the client-supplied content type can't be trusted)
+    
+    Parameters:
+    -----------
+    image_bytes : bytes
+        Encoded image file contents
+    
+    Returns:
+    --------
+    format : str or None
+        'jpeg', 'png', 'bmp', 'tiff' or 'webp', None if not a supported image
+    """
+    for image_format, signatures in IMAGE_MAGIC.items():
+        if image_bytes.startswith(signatures):
+            return image_format
+    
+    # WEBP: 'RIFF' + 4 size bytes + 'WEBP'
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'webp'
+    
+    return None
+
+
+def jpeg_orientation(image_bytes):
+    """
+    Read the EXIF orientation tag of a JPEG (e.g. 6 = phone held upright,
+    image stored sideways) without decoding any pixels
+    
+    Parameters:
+    -----------
+    image_bytes : bytes
+        Encoded JPEG file contents
+    
+    Returns:
+    --------
+    orientation : int
+        EXIF orientation 1-8, 1 (= stored upright) if there is no tag
+    """
+    pos = 2  # Skip the SOI marker
+    while pos + 4 <= len(image_bytes) and image_bytes[pos] == 0xFF:
+        marker = image_bytes[pos + 1]
+        if marker in (0xD9, 0xDA):
+            break  # End of image / start of pixel data - no EXIF header
+        length = int.from_bytes(image_bytes[pos + 2:pos + 4], 'big')
+        
+        if marker == 0xE1 and image_bytes[pos + 4:pos + 10] == b'Exif\x00\x00':
+            tiff = image_bytes[pos + 10:pos + 2 + length]
+            order = 'little' if tiff[:2] == b'II' else 'big'
+            ifd = int.from_bytes(tiff[4:8], order)
+            count = int.from_bytes(tiff[ifd:ifd + 2], order)
+            for i in range(count):
+                entry = ifd + 2 + 12 * i
+                if int.from_bytes(tiff[entry:entry + 2], order) == 0x0112:
+                    orientation = int.from_bytes(tiff[entry + 8:entry + 10], order)
+                    return orientation if 1 <= orientation <= 8 else 1
+            return 1
+        
+        pos += 2 + length
+    return 1
+
+
+def decode_grayscale(image_bytes):
+    """
+    Decode raw image bytes into a grayscale image
+    
+    JPEGs are decoded with libjpeg-turbo when available,
+    everything else (PNG, BMP, TIFF, ...) goes through OpenCV
+    (so do rotated JPEGs: OpenCV applies the EXIF orientation and
+    TurboJPEG doesn't - both paths must give the same image)
+    
+    Parameters:
+    -----------
+    image_bytes : bytes
+        Encoded image file contents
+    
+    Returns:
+    --------
+    img : numpy array or None
+        2D uint8 grayscale image, None if decoding failed
+    """
+    if (turbo is not None and image_bytes.startswith(IMAGE_MAGIC['jpeg'])
+            and jpeg_orientation(image_bytes) == 1):
+        try:
+            img = turbo.decode(image_bytes, pixel_format=TJPF_GRAY)
+            # TurboJPEG returns (H, W, 1) for grayscale
+            return img.reshape(img.shape[0], img.shape[1])
+        except (OSError, ValueError):
+            pass  # Let OpenCV try (e.g. truncated or unusual JPEG)
+    
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+
+
+def resize_signature(img):
+    """
+    Resize a grayscale image to IMAGE_SIZE
+    
+    The result is written into a buffer owned by the calling thread and
+    reused on every call, so it is overwritten by that thread's next call.
+    Consume it (e.g. normalize it into another array) before resizing again.
+    
+    Parameters:
+    -----------
+    img : numpy array
+        2D uint8 grayscale image of any size
+    
+    Returns:
+    --------
+    resized : numpy array
+        2D uint8 (128, 128) image (the thread's reusable buffer)
+    """
+    buffer = getattr(_thread_buffers, 'resize', None)
+    if buffer is None:
+        buffer = np.empty(config.INPUT_SHAPE[:2], dtype=np.uint8)
+        _thread_buffers.resize = buffer
+    
+    # INTER_AREA when shrinking (faster, anti-aliased box filter),
+    # INTER_LINEAR when the image is smaller than the target
+    height, width = config.INPUT_SHAPE[:2]
+    if img.shape[0] >= height and img.shape[1] >= width:
+        interpolation = cv2.INTER_AREA
+    else:
+        interpolation = cv2.INTER_LINEAR
+    
+    return cv2.resize(img, config.IMAGE_SIZE, dst=buffer, interpolation=interpolation)
+
+
+def _list_subfolders(path, lowercase=True):
+    """
+    List the sub-folders of a directory with a single os.scandir() pass
+    
+    Returns:
+    --------
+    subfolders : dict
+        Folder name (lowercased by default) → full path
+    """
+    with os.scandir(path) as entries:
+        return {
+            (entry.name.lower() if lowercase else entry.name): entry.path
+            for entry in entries if entry.is_dir()
+        }
+
+
+def _find_images_folder(subfolders, candidates):
+    """
+    Pick the first candidate folder that exists
+    Candidates like 'genuine/images' are only looked up inside their parent
+    folder when that parent exists, so each parent is scanned at most once
+    
+    Parameters:
+    -----------
+    subfolders : dict
+        Output of _list_subfolders() for a user folder
+    candidates : list
+        Folder names to try, in order of preference
+    
+    Returns:
+    --------
+    path : str or None
+        Folder containing the images, None if no candidate exists
+    """
+    nested = {}
+    for name in candidates:
+        parent, _, child = name.partition('/')
+        path = subfolders.get(parent)
+        if path is None:
+            continue
+        if not child:
+            return path
+        if parent not in nested:
+            nested[parent] = _list_subfolders(path)
+        if child in nested[parent]:
+            return nested[parent][child]
+    return None
+
+
+def _decode_one(img_path, out):
+    """
+    Read, resize and normalize one image into a pre-allocated slot
+    
+    Parameters:
+    -----------
+    img_path : str
+        Path to the image file
+    out : numpy array
+        float32 (128, 128) slot to write the normalized image into
+    
+    Returns:
+    --------
+    success : bool
+        False if the image could not be read
+    """
+    # Read image in grayscale (1 channel)
+    try:
+        with open(img_path, 'rb') as f:
+            img = decode_grayscale(f.read())
+    except OSError:
+        return False
+    
+    if img is None:
+        return False
+    
+    # Resize to standard size (128x128) into this thread's reusable buffer
+    img = resize_signature(img)
+    
+    # Normalize pixel values: 0-255 → 0-1
+    # This helps the neural network learn better!
+    # Written as float32 directly into the output array
+    np.multiply(img, PIXEL_SCALE, out=out, dtype=np.float32)
+    
+    return True
+
+
+def list_image_files(folder_path):
+    """
+    List the image files (by extension) in a folder
+    
+    Returns:
+    --------
+    image_files : list
+        File names of images in the folder
+    """
+    return [f for f in os.listdir(folder_path)
+            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+
+
+def load_images_from_folder(folder_path, label, out=None, labels_out=None):
     """
     Load all images from a folder and assign them a label
     
@@ -19,61 +279,72 @@ def load_images_from_folder(folder_path, label):
         Path to folder containing images
     label : int
         0 for forged, 1 for genuine
+    out : numpy array (optional)
+        float32 (N, 128, 128) array to decode into, N >= number of images
+        Lets the caller fill its final dataset array in place
+    labels_out : numpy array (optional)
+        Array of length >= N to write the labels into
     
     Returns:
     --------
     images : numpy array
-        Array of preprocessed images
+        Array of preprocessed images (a view of `out` if given)
     labels : numpy array
-        Array of corresponding labels
+        Array of corresponding labels (a view of `labels_out` if given)
     """
-    images = []
-    labels = []
-    
     print(f"\n📂 Loading images from: {folder_path}")
     
     if not os.path.exists(folder_path):
         print(f"❌ ERROR: Folder not found: {folder_path}")
         return np.array([]), np.array([])
     
-    # List ALL files to debug
-    all_files = os.listdir(folder_path)
-    print(f"🔍 DEBUG: Found {len(all_files)} total files in folder")
-    if len(all_files) > 0 and len(all_files) <= 5:
-        print(f"🔍 DEBUG: Files are: {all_files}")
-    
     # Get list of image files
-    image_files = [f for f in all_files 
-                   if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.tiff'))]
+    image_files = list_image_files(folder_path)
     
     print(f"📸 Found {len(image_files)} image files")
-    
-    for idx, filename in enumerate(image_files):
-        img_path = os.path.join(folder_path, filename)
-        
-        # Read image in grayscale (1 channel)
-        img = cv2.imread(img_path, cv2.IMREAD_GRAYSCALE)
+    if 0 < len(image_files) <= 5:
+        print(f"🔍 DEBUG: Files are: {image_files}")
+    
+    # Pre-allocate the output once instead of growing a Python list
+    # and copying it into an array at the end
+    if out is None:
+        out = np.empty((len(image_files),) + config.INPUT_SHAPE[:2], dtype=np.float32)
+    elif len(out) < len(image_files):
+        raise ValueError(f"Output has room for {len(out)} images, folder has {len(image_files)}")
+    
+    loaded = np.zeros(len(image_files), dtype=bool)
+    
+    # Decode in parallel - OpenCV/libjpeg-turbo release the GIL while working
+    with ThreadPoolExecutor(max_workers=config.LOADER_THREADS) as executor:
+        jobs = [
+            executor.submit(_decode_one, os.path.join(folder_path, filename), out[idx])
+            for idx, filename in enumerate(image_files)
+        ]
         
-        if img is not None:
-            # Resize to standard size (128x128)
-            img = cv2.resize(img, config.IMAGE_SIZE)
-            
-            # Normalize pixel values: 0-255 → 0-1
-            # This helps the neural network learn better!
-            img = img / 255.0
-            
-            images.append(img)
-            labels.append(label)
-            
+        for done, job in enumerate(as_completed(jobs), start=1):
             # Progress indicator
-            if (idx + 1) % 50 == 0:
-                print(f"  ✓ Processed {idx + 1}/{len(image_files)} images")
-        else:
-            print(f"  ⚠ Warning: Could not read {filename}")
+            if done % 50 == 0:
+                print(f"  ✓ Processed {done}/{len(image_files)} images")
+        
+        for idx, job in enumerate(jobs):
+            loaded[idx] = job.result()
+            if not loaded[idx]:
+                print(f"  ⚠ Warning: Could not read {image_files[idx]}")
+    
+    # Move loaded images up over rows left empty by unreadable files
+    count = int(loaded.sum())
+    if count < len(image_files):
+        out[:count] = out[:len(image_files)][loaded]
+    images = out[:count]
+    
+    if labels_out is None:
+        labels_out = np.empty(count, dtype=np.int8)
+    labels = labels_out[:count]
+    labels[:] = label
     
-    print(f"✅ Successfully loaded {len(images)} images")
+    print(f"✅ Successfully loaded {count} images")
     
-    return np.array(images), np.array(labels)
+    return images, labels
 
 
 def prepare_dataset():
@@ -92,100 +363,82 @@ def prepare_dataset():
     print("🚀 STARTING DATA PREPARATION")
     print("="*60)
     
-    dataset_path = os.path.join(config.BASE_DIR, 'Dataset')
+    dataset_path = config.DATASET_DIR
     
-    # Lists to store all images and labels
-    all_genuine_images = []
-    all_genuine_labels = []
-    all_forged_images = []
-    all_forged_labels = []
+    # Folders to load for each class, with their image counts
+    genuine_folders = []
+    forged_folders = []
     
     # Get all user folders (u07, u09, u014, etc.)
-    user_folders = [f for f in os.listdir(dataset_path) 
-                    if os.path.isdir(os.path.join(dataset_path, f))]
+    user_folders = list(_list_subfolders(dataset_path, lowercase=False))
     
     print(f"\n📂 Found {len(user_folders)} user folders: {user_folders}")
     
-    # Iterate through each user folder
+    # First pass: find each user's folders and count their images
     for user_folder in user_folders:
         user_path = os.path.join(dataset_path, user_folder)
         
-        print(f"\n👤 Processing user: {user_folder}")
+        print(f"\n👤 Scanning user: {user_folder}")
+        
+        # One directory scan per user instead of an exists() check per candidate
+        subfolders = _list_subfolders(user_path)
         
         # Path to genuine signatures - checking multiple possible structures
-        genuine_path = os.path.join(user_path, 'genuine', 'images')
-        if not os.path.exists(genuine_path):
-            genuine_path = os.path.join(user_path, 'genuine_images')
-        if not os.path.exists(genuine_path):
-            genuine_path = os.path.join(user_path, 'genuine')
+        genuine_path = _find_images_folder(subfolders, GENUINE_FOLDER_NAMES)
         
         # Path to forged signatures - checking multiple possible structures
         # Most common: 'skilled forgery' with SPACE
-        forged_path = os.path.join(user_path, 'skilled forgery', 'images')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'skilled_forgery', 'images')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'skilled_forgery_images')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'forged_images')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'forged', 'images')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'skilled forgery')
-        if not os.path.exists(forged_path):
-            forged_path = os.path.join(user_path, 'skilled_forgery')
+        forged_path = _find_images_folder(subfolders, FORGED_FOLDER_NAMES)
         
-        # Load genuine signatures (label = 1)
-        if os.path.exists(genuine_path):
-            print(f"  📝 Loading genuine signatures from {user_folder}...")
-            genuine_imgs, genuine_lbls = load_images_from_folder(genuine_path, label=1)
-            if len(genuine_imgs) > 0:
-                all_genuine_images.append(genuine_imgs)
-                all_genuine_labels.append(genuine_lbls)
-            else:
-                print(f"     ⚠ No valid images loaded from genuine folder")
+        if genuine_path is not None:
+            genuine_folders.append((genuine_path, len(list_image_files(genuine_path))))
         else:
             print(f"  ⚠ Warning: No 'genuine' folder found for {user_folder}")
-            print(f"     Tried path: {genuine_path}")
+            print(f"     Tried folders: {GENUINE_FOLDER_NAMES}")
         
-        # Load forged signatures (label = 0)
-        if os.path.exists(forged_path):
-            print(f"  🖊️ Loading forged signatures from {user_folder}...")
-            forged_imgs, forged_lbls = load_images_from_folder(forged_path, label=0)
-            if len(forged_imgs) > 0:
-                all_forged_images.append(forged_imgs)
-                all_forged_labels.append(forged_lbls)
-            else:
-                print(f"     ⚠ No valid images loaded from forged folder")
+        if forged_path is not None:
+            forged_folders.append((forged_path, len(list_image_files(forged_path))))
         else:
             print(f"  ⚠ Warning: No 'skilled_forgery' or 'forged' folder found for {user_folder}")
-            print(f"     🔍 DEBUG: Checked path: {forged_path}")
-            print(f"     🔍 DEBUG: User path contents: {os.listdir(user_path)}")
-    
-    # Combine all genuine signatures from all users
-    print("\n1️⃣ Combining GENUINE signatures from all users...")
-    if all_genuine_images:
-        genuine_images = np.concatenate(all_genuine_images, axis=0)
-        genuine_labels = np.concatenate(all_genuine_labels, axis=0)
-        print(f"   Total genuine images: {len(genuine_images)}")
-    else:
-        genuine_images = np.array([])
-        genuine_labels = np.array([])
-        print(f"   ⚠ No genuine images loaded!")
-    
-    # Combine all forged signatures from all users
-    print("2️⃣ Combining FORGED signatures from all users...")
-    if all_forged_images:
-        forged_images = np.concatenate(all_forged_images, axis=0)
-        forged_labels = np.concatenate(all_forged_labels, axis=0)
-        print(f"   Total forged images: {len(forged_images)}")
-    else:
-        forged_images = np.array([])
-        forged_labels = np.array([])
-        print(f"   ⚠ No forged images loaded!")
+            print(f"     🔍 DEBUG: Checked folders: {FORGED_FOLDER_NAMES}")
+            print(f"     🔍 DEBUG: User sub-folders: {list(subfolders)}")
+    
+    # Allocate the final arrays once - every image is decoded straight
+    # into its place, no per-user arrays and no concatenation copies
+    total = sum(count for _, count in genuine_folders + forged_folders)
+    X = np.empty((total,) + config.INPUT_SHAPE[:2], dtype=np.float32)
+    y = np.empty(total, dtype=np.int8)
+    offset = 0
+    
+    # Second pass: load genuine signatures (label = 1), then forged (label = 0)
+    print("\n1️⃣ Loading GENUINE signatures from all users...")
+    for folder_path, count in genuine_folders:
+        images, _ = load_images_from_folder(
+            folder_path, label=1,
+            out=X[offset:offset + count], labels_out=y[offset:offset + count]
+        )
+        if len(images) == 0:
+            print(f"     ⚠ No valid images loaded from genuine folder")
+        offset += len(images)
+    
+    num_genuine = offset
+    print(f"   Total genuine images: {num_genuine}")
+    
+    print("2️⃣ Loading FORGED signatures from all users...")
+    for folder_path, count in forged_folders:
+        images, _ = load_images_from_folder(
+            folder_path, label=0,
+            out=X[offset:offset + count], labels_out=y[offset:offset + count]
+        )
+        if len(images) == 0:
+            print(f"     ⚠ No valid images loaded from forged folder")
+        offset += len(images)
+    
+    num_forged = offset - num_genuine
+    print(f"   Total forged images: {num_forged}")
     
     # Check if data was loaded
-    if len(genuine_images) == 0 or len(forged_images) == 0:
+    if num_genuine == 0 or num_forged == 0:
         print("\n❌ ERROR: No images found!")
         print("Please check your Dataset folder structure:")
         print("  Dataset/")
@@ -194,14 +447,14 @@ def prepare_dataset():
         print("        └── skilled_forgery_images/")
         return None, None, None
     
-    # Combine genuine and forged signatures
-    print("\n3️⃣ Combining datasets...")
-    X = np.concatenate([genuine_images, forged_images], axis=0)
-    y = np.concatenate([genuine_labels, forged_labels], axis=0)
+    # Drop rows left empty by unreadable files (views, no copy)
+    X = X[:offset]
+    y = y[:offset]
     
+    print("\n3️⃣ Combined dataset:")
     print(f"  Total images: {len(X)}")
-    print(f"  - Genuine: {len(genuine_images)}")
-    print(f"  - Forged: {len(forged_images)}")
+    print(f"  - Genuine: {num_genuine}")
+    print(f"  - Forged: {num_forged}")
     
     # Reshape for neural network
     # Add channel dimension: (samples, height, width) → (samples, height, width, channels)
@@ -238,9 +491,9 @@ def prepare_dataset():
     print(f"  Total:      {len(X)} images")
     
     print(f"\n🎯 Class Distribution:")
-    print(f"  Training - Genuine: {sum(y_train)}, Forged: {len(y_train) - sum(y_train)}")
-    print(f"  Validation - Genuine: {sum(y_val)}, Forged: {len(y_val) - sum(y_val)}")
-    print(f"  Testing - Genuine: {sum(y_test)}, Forged: {len(y_test) - sum(y_test)}")
+    print(f"  Training - Genuine: {int(y_train.sum())}, Forged: {len(y_train) - int(y_train.sum())}")
+    print(f"  Validation - Genuine: {int(y_val.sum())}, Forged: {len(y_val) - int(y_val.sum())}")
+    print(f"  Testing - Genuine: {int(y_test.sum())}, Forged: {len(y_test) - int(y_test.sum())}")
     print("="*60)
     
     return (X_train, y_train), (X_val, y_val), (X_test, y_test)
@@ -4,17 +4,46 @@ Defines the ANN architecture with save/load functionality
 """
 
 import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import config
+
+# oneDNN + CPU thread settings (must be set before TensorFlow is imported)
+# Skipped when TensorFlow is already loaded (e.g. by app.py, which picks its
+# own per-worker values) - setting them then would only leak into child processes
+if 'tensorflow' not in sys.modules:
+    for _name, _value in config.CPU_ENV_VARS.items():
+        os.environ.setdefault(_name, _value)
+
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers, models
-import config
 
-def build_model():
+# Numeric precision for all layers built from here on (see config.PRECISION)
+keras.mixed_precision.set_global_policy(config.PRECISION)
+
+# Let XLA compile and fuse TensorFlow graphs (see config.JIT_COMPILE)
+if config.JIT_COMPILE:
+    tf.config.optimizer.set_jit(True)
+
+# Architecture built by load_model(format='weights'), reused on every reload
+_MODEL_CACHE = None
+
+def build_model(compile=True):
     """
     Build the ANN architecture for signature verification
     
     Architecture:
-    Input (16,384) → Dense(256) → Dense(128) → Dense(64) → Output(1)
+    Input (16,384) → Proj(64) → Dense(256) → Dense(128) → Dense(64) → Output(1)
+    (Proj is skipped when config.LOW_RANK_DIM is 0)
+    
+    Parameters:
+    -----------
+    compile : bool
+        False = skip compiling (no optimizer, loss or metrics)
+        Enough for inference, and faster to build
     
     Returns:
     --------
@@ -29,17 +58,27 @@ def build_model():
     # Initialize Sequential model (layers stacked one after another)
     model = models.Sequential(name='Signature_Verification_ANN')
     
-    # INPUT LAYER (automatically handled by first Dense layer)
-    # Input shape: (128, 128, 1) = 16,384 pixels
-    
-    # FLATTEN LAYER - Convert 2D image to 1D vector
-    # (128, 128, 1) → (16,384)
-    print("\n1️⃣ Adding Flatten Layer")
-    print(f"   Input:  (128, 128, 1) → Output: (16,384)")
-    model.add(layers.Flatten(input_shape=config.INPUT_SHAPE, name='flatten'))
+    # INPUT LAYER - images arrive already flattened
+    # (128, 128, 1) → (16,384) is done ONCE on the whole dataset before
+    # training, so no Flatten/reshape op runs on every training step
+    print("\n1️⃣ Adding Input Layer")
+    print(f"   Input: ({config.INPUT_DIM:,}) flattened pixels")
+    model.add(layers.Input(shape=(config.INPUT_DIM,), name='input'))
     
     # HIDDEN LAYER 1 - 256 neurons
     print(f"\n2️⃣ Adding Hidden Layer 1")
+    
+    # Low-rank projection: 16,384 → 64 → 256 instead of 16,384 → 256
+    # Linear, no bias - just a cheaper factorization of the same layer
+    if config.LOW_RANK_DIM:
+        print(f"   Low-rank projection: {config.INPUT_DIM:,} → {config.LOW_RANK_DIM}")
+        model.add(layers.Dense(
+            units=config.LOW_RANK_DIM,
+            activation=None,
+            use_bias=False,
+            name='proj'
+        ))
+    
     print(f"   Neurons: {config.HIDDEN_LAYER_1}")
     print(f"   Activation: {config.HIDDEN_ACTIVATION}")
     model.add(layers.Dense(
@@ -71,31 +110,52 @@ def build_model():
     # OUTPUT LAYER - 1 neuron (binary classification)
     print(f"\n5️⃣ Adding Output Layer")
     print(f"   Neurons: 1")
-    print(f"   Activation: {config.OUTPUT_ACTIVATION} (outputs probability 0-1)")
+    print(f"   Activation: none (outputs a logit)")
+    print(f"   {config.OUTPUT_ACTIVATION} is fused into the loss for training and")
+    print(f"   added back for predictions (see with_sigmoid)")
+    # Always float32, even with mixed precision, to keep the loss numerically stable
     model.add(layers.Dense(
         units=1,
-        activation=config.OUTPUT_ACTIVATION,
+        activation=None,
+        dtype='float32',
         name='output_layer'
     ))
     
+    if not compile:
+        print("\n✅ Model built (not compiled - inference only)")
+        print("="*60)
+        return model
+    
     # COMPILE MODEL
     print(f"\n6️⃣ Compiling Model")
     print(f"   Optimizer: {config.OPTIMIZER} (learning_rate={config.LEARNING_RATE})")
-    print(f"   Loss: {config.LOSS_FUNCTION}")
+    print(f"   Loss: {config.LOSS_FUNCTION} (from logits)")
     print(f"   Metrics: {config.METRICS} + Precision + Recall")
+    print(f"   Precision policy: {config.PRECISION}")
+    print(f"   XLA JIT compilation: {config.JIT_COMPILE}")
     
-    # Use proper metric objects for Precision and Recall
-    from tensorflow.keras.metrics import Precision, Recall
+    # Use proper metric objects for Accuracy, Precision and Recall
+    # The model outputs logits: logit 0 = probability 0.5, so threshold at 0
+    from tensorflow.keras.metrics import BinaryAccuracy, Precision, Recall
     
-    metrics = config.METRICS + [
-        Precision(name='precision'),
-        Recall(name='recall')
+    metrics = [
+        BinaryAccuracy(name='accuracy', threshold=0.0),
+        Precision(name='precision', thresholds=0.0),
+        Recall(name='recall', thresholds=0.0)
     ]
     
+    optimizer = keras.optimizers.Adam(learning_rate=config.LEARNING_RATE)
+    
+    # float16 gradients can underflow - scale the loss to keep them representable
+    if config.PRECISION == 'mixed_float16':
+        optimizer = keras.mixed_precision.LossScaleOptimizer(optimizer)
+    
     model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=config.LEARNING_RATE),
-        loss=config.LOSS_FUNCTION,
-        metrics=metrics
+        optimizer=optimizer,
+        # Sigmoid + log in one numerically stable op (no log(0))
+        loss=keras.losses.BinaryCrossentropy(from_logits=True),
+        metrics=metrics,
+        jit_compile=config.JIT_COMPILE
     )
     
     print("\n✅ Model built and compiled successfully!")
@@ -122,10 +182,10 @@ def get_model_summary(model):
     
     print("="*60)
     
-    # Calculate total parameters
-    trainable_params = sum([tf.size(w).numpy() for w in model.trainable_weights])
-    non_trainable_params = sum([tf.size(w).numpy() for w in model.non_trainable_weights])
-    total_params = trainable_params + non_trainable_params
+    # Calculate total parameters (from the known weight shapes, no tensor reads)
+    total_params = int(model.count_params())
+    trainable_params = int(sum(np.prod(w.shape) for w in model.trainable_weights))
+    non_trainable_params = total_params - trainable_params
     
     print(f"\n📊 PARAMETER BREAKDOWN:")
     print(f"   Trainable Parameters:     {trainable_params:,}")
@@ -138,24 +198,218 @@ def get_model_summary(model):
     print(f"   ~{size_mb:.2f} MB")
     
     print(f"\n🔗 ARCHITECTURE FLOW:")
-    print(f"   Input (128×128×1)")
-    print(f"      ↓")
-    print(f"   Flatten → 16,384 nodes")
+    print(f"   Input (128×128×1, flattened → {config.INPUT_DIM:,} nodes)")
     print(f"      ↓")
+    if config.LOW_RANK_DIM:
+        print(f"   Dense ({config.LOW_RANK_DIM}), linear projection")
+        print(f"      ↓")
     print(f"   Dense ({config.HIDDEN_LAYER_1}) + ReLU")
     print(f"      ↓")
     print(f"   Dense ({config.HIDDEN_LAYER_2}) + ReLU")
     print(f"      ↓")
     print(f"   Dense ({config.HIDDEN_LAYER_3}) + ReLU")
     print(f"      ↓")
-    print(f"   Dense (1) + Sigmoid")
+    print(f"   Dense (1) → logit")
+    print(f"      ↓")
+    print(f"   Sigmoid (in the loss / added for predictions)")
     print(f"      ↓")
     print(f"   Output: Probability (0.0 - 1.0)")
     
     print("="*60)
 
 
-def save_model(model, model_name='signature_model'):
+def outputs_logits(model):
+    """
+    Check whether a model's output layer has no activation (outputs logits)
+    Models saved before the switch to logits end in a sigmoid instead
+    
+    Parameters:
+    -----------
+    model : keras.Model
+        Neural network model
+    
+    Returns:
+    --------
+    is_logits : bool
+        True if the output still needs a sigmoid to become a probability
+    """
+    activation = getattr(model.layers[-1], 'activation', None)
+    return getattr(activation, '__name__', None) == 'linear'
+
+
+def with_sigmoid(model):
+    """
+    Get a version of the model that outputs probabilities (0-1)
+    Adds the sigmoid on top of logit models, returns other models unchanged
+    
+    Parameters:
+    -----------
+    model : keras.Model
+        Neural network model
+    
+    Returns:
+    --------
+    model : keras.Model
+        Model whose output is the genuine probability
+    """
+    if not outputs_logits(model):
+        return model
+    
+    probability = layers.Activation(
+        config.OUTPUT_ACTIVATION,
+        dtype='float32',
+        name='probability'
+    )(model.outputs[0])
+    return keras.Model(inputs=model.inputs, outputs=probability, name=model.name)
+
+
+def make_fused_infer(model):
+    """
+    Re-express the trained network as one XLA-compiled inference function
+    
+    The Dense layers' weights are frozen as constants and the forward pass
+    is written out as plain matmuls, so XLA can fuse every
+    MatMul + BiasAdd + ReLU into a single kernel (no optimizer, no Keras
+    layer overhead). Inference only - the weights can't be trained further.
+    
+    Parameters:
+    -----------
+    model : keras.Model
+        Trained neural network model
+    
+    Returns:
+    --------
+    fused_infer : tf.function
+        Takes a float32 batch of shape (N, 16384), returns probabilities (N, 1)
+    """
+    # (kernel, bias or None, activation) for every Dense layer, in order
+    dense_params = []
+    for layer in model.layers:
+        if isinstance(layer, layers.Dense):
+            weights = layer.get_weights()
+            kernel = tf.constant(weights[0], dtype=tf.float32)
+            bias = tf.constant(weights[1], dtype=tf.float32) if layer.use_bias else None
+            dense_params.append((kernel, bias, layer.activation))
+    
+    # Logit models still need their sigmoid to output probabilities
+    add_sigmoid = outputs_logits(model)
+    
+    @tf.function(
+        jit_compile=True,
+        input_signature=[tf.TensorSpec((None, config.INPUT_DIM), tf.float32, name='input')]
+    )
+    def fused_infer(x):
+        h = x
+        for kernel, bias, activation in dense_params:
+            h = tf.matmul(h, kernel)
+            if bias is not None:
+                h = h + bias
+            h = activation(h)
+        if add_sigmoid:
+            h = tf.sigmoid(h)
+        return h
+    
+    return fused_infer
+
+
+def convert_to_tflite_int8(model, representative_data=None):
+    """
+    Convert a Keras model to an INT8-quantized TFLite model
+    
+    Parameters:
+    -----------
+    model : keras.Model
+        Trained neural network model
+    representative_data : numpy array (optional)
+        Sample inputs used to calibrate activation ranges
+        None = dynamic-range quantization (int8 weights only)
+    
+    Returns:
+    --------
+    tflite_bytes : bytes
+        Serialized TFLite model
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    
+    if representative_data is not None:
+        def representative_dataset():
+            for sample in representative_data[:100]:
+                yield [np.asarray(sample[np.newaxis], dtype=np.float32)]
+        
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    
+    return converter.convert()
+
+
+def convert_to_tensorrt(model, model_name, representative_data=None):
+    """
+    Convert a Keras model to a TF-TRT (TensorRT) optimized SavedModel
+    TensorRT fuses layers and auto-tunes CUDA kernels for the local GPU
+    
+    Parameters:
+    -----------
+    model : keras.Model
+        Trained neural network model
+    model_name : str
+        Name for the saved model (without extension)
+    representative_data : numpy array (optional)
+        Sample of training inputs - required for INT8 precision, where
+        TensorRT runs it through the model to pick the INT8 value ranges
+    
+    Returns:
+    --------
+    trt_dir : str
+        Directory of the TensorRT-optimized SavedModel
+    """
+    from tensorflow.python.compiler.tensorrt import trt_convert as trt
+    
+    calibration_input_fn = None
+    if config.TENSORRT_PRECISION == 'INT8':
+        if representative_data is None:
+            raise ValueError("INT8 precision needs representative data for calibration")
+        
+        def calibration_input_fn():
+            # 10 batches are enough to estimate each layer's value range
+            for start in range(0, min(len(representative_data), config.BATCH_SIZE * 10),
+                               config.BATCH_SIZE):
+                batch = representative_data[start:start + config.BATCH_SIZE]
+                yield (tf.constant(np.asarray(batch, dtype=np.float32)),)
+    
+    trt_dir = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_trt')
+    params = trt.TrtConversionParams(
+        precision_mode=getattr(trt.TrtPrecisionMode, config.TENSORRT_PRECISION),
+        max_workspace_size_bytes=1 << 30
+    )
+    
+    # TF-TRT converts SavedModels, so export one first
+    # (to a temporary directory - only the converted model is kept)
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        tf.saved_model.save(with_sigmoid(model), saved_model_dir)
+        converter = trt.TrtGraphConverterV2(
+            input_saved_model_dir=saved_model_dir,
+            conversion_params=params
+        )
+        converter.convert(calibration_input_fn=calibration_input_fn)
+        converter.save(trt_dir)
+    
+    return trt_dir
+
+
+def _path_size_mb(path):
+    """Size of a saved file, or of all files inside a saved directory, in MB"""
+    if os.path.isdir(path):
+        total = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(path) for name in files
+        )
+    else:
+        total = os.path.getsize(path)
+    return total / (1024 * 1024)
+
+
+def save_model(model, model_name='signature_model', representative_data=None):
     """
     Save the trained model to disk
     Saves in multiple formats for compatibility
@@ -166,6 +420,11 @@ def save_model(model, model_name='signature_model'):
         Trained neural network model
     model_name : str
         Name for the saved model (without extension)
+    representative_data : numpy array (optional)
+        Sample input images (e.g. part of the training set)
+        If given, the TFLite model is fully integer-quantized (weights AND
+        activations); otherwise only the weights are quantized
+        Also calibrates the TensorRT engine when TENSORRT_PRECISION is 'INT8'
     
     Returns:
     --------
@@ -189,17 +448,19 @@ def save_model(model, model_name='signature_model'):
     save_paths['keras'] = keras_path
     print(f"   ✓ Saved to: {keras_path}")
     
-    # 2. Save in H5 format (.h5) - Legacy format
-    h5_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}.h5')
-    print(f"\n2️⃣ Saving in H5 format (.h5)...")
-    model.save(h5_path)
-    save_paths['h5'] = h5_path
-    print(f"   ✓ Saved to: {h5_path}")
-    
-    # 3. Save model weights only
-    weights_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_weights.h5')
+    # 2. Save in H5 format (.h5) - Legacy format, same data as .keras
+    if config.LEGACY_H5:
+        h5_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}.h5')
+        print(f"\n2️⃣ Saving in H5 format (.h5)...")
+        model.save(h5_path)
+        save_paths['h5'] = h5_path
+        print(f"   ✓ Saved to: {h5_path}")
+    
+    # 3. Save model weights only - plain NumPy arrays (.npz), in layer order
+    # Much faster to write and read than HDF5 for a few big weight matrices
+    weights_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_weights.npz')
     print(f"\n3️⃣ Saving model weights only...")
-    model.save_weights(weights_path)
+    np.savez(weights_path, **{f'weight_{i}': w for i, w in enumerate(model.get_weights())})
     save_paths['weights'] = weights_path
     print(f"   ✓ Saved to: {weights_path}")
     
@@ -212,18 +473,113 @@ def save_model(model, model_name='signature_model'):
     save_paths['json'] = json_path
     print(f"   ✓ Saved to: {json_path}")
     
+    # 5. Save INT8 quantized TFLite model - 4x smaller, fast int8 math on CPU
+    if config.SAVE_TFLITE_INT8:
+        tflite_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_int8.tflite')
+        print(f"\n5️⃣ Saving INT8 quantized model (TFLite)...")
+        try:
+            with open(tflite_path, 'wb') as tflite_file:
+                tflite_file.write(convert_to_tflite_int8(with_sigmoid(model), representative_data))
+            save_paths['tflite_int8'] = tflite_path
+            print(f"   ✓ Saved to: {tflite_path}")
+        except Exception as e:
+            print(f"   ⚠ INT8 conversion failed, skipping: {str(e)}")
+    
+    # 6. Save TensorRT engine (TF-TRT) - GPU machines only
+    if config.SAVE_TENSORRT:
+        print(f"\n6️⃣ Saving TensorRT optimized model (TF-TRT)...")
+        if tf.config.list_physical_devices('GPU'):
+            try:
+                trt_dir = convert_to_tensorrt(model, model_name, representative_data)
+                save_paths['tensorrt'] = trt_dir
+                print(f"   ✓ Saved to: {trt_dir}")
+            except Exception as e:
+                print(f"   ⚠ TensorRT conversion failed, skipping: {str(e)}")
+        else:
+            print(f"   ⚠ No GPU found, skipping")
+    
+    # 7. Save fused XLA inference function (SavedModel) - for serving/deployment
+    if config.SAVE_FUSED_INFER:
+        fused_dir = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_fused')
+        print(f"\n7️⃣ Saving fused inference model (XLA SavedModel)...")
+        try:
+            module = tf.Module()
+            module.infer = make_fused_infer(model)
+            tf.saved_model.save(module, fused_dir, signatures={'serving_default': module.infer})
+            save_paths['fused'] = fused_dir
+            print(f"   ✓ Saved to: {fused_dir}")
+        except Exception as e:
+            print(f"   ⚠ Fused export failed, skipping: {str(e)}")
+    
     print("\n" + "="*60)
     print("✅ MODEL SAVED SUCCESSFULLY!")
     print("="*60)
     print("\n📁 Saved Files:")
     for format_type, path in save_paths.items():
-        file_size = os.path.getsize(path) / (1024 * 1024)  # Convert to MB
+        file_size = _path_size_mb(path)
         print(f"   {format_type.upper():8s}: {path} ({file_size:.2f} MB)")
     print("="*60)
     
     return save_paths
 
 
+def link_saved_model(save_paths, model_name, link_name='signature_model_latest'):
+    """
+    Make the files of a saved model also available under another name
+    Uses symlinks, so nothing is written twice
+    Falls back to copying where symlinks aren't allowed (e.g. Windows
+    without developer mode)
+    
+    Parameters:
+    -----------
+    save_paths : dict
+        Paths returned by save_model()
+    model_name : str
+        Name the model was saved under
+    link_name : str
+        Extra name to make the model loadable as
+    
+    Returns:
+    --------
+    link_paths : dict
+        Dictionary containing the paths of the links
+    """
+    link_paths = {}
+    
+    for format_type, path in save_paths.items():
+        folder, file_name = os.path.split(path)
+        link_path = os.path.join(folder, file_name.replace(model_name, link_name, 1))
+        
+        # Build the new link (or copy) next to the old one, then swap it in
+        # with a single rename - a server reloading at that moment sees
+        # either the old or the new model, never a missing file
+        tmp_path = link_path + '.tmp'
+        if os.path.islink(tmp_path) or os.path.isfile(tmp_path):
+            os.remove(tmp_path)  # Left over from an interrupted run
+        elif os.path.isdir(tmp_path):
+            shutil.rmtree(tmp_path)
+        
+        try:
+            # Relative target, so the folder can be moved around
+            os.symlink(file_name, tmp_path, target_is_directory=os.path.isdir(path))
+        except (OSError, NotImplementedError):
+            if os.path.isdir(path):
+                shutil.copytree(path, tmp_path)
+            else:
+                shutil.copyfile(path, tmp_path)
+        
+        # A copied directory can't be replaced by a rename, remove it first
+        if os.path.isdir(link_path) and not os.path.islink(link_path):
+            shutil.rmtree(link_path)
+        os.replace(tmp_path, link_path)
+        
+        link_paths[format_type] = link_path
+    
+    print(f"🔗 Linked {len(link_paths)} files as '{link_name}'")
+    
+    return link_paths
+
+
 def load_model(model_name='signature_model', format='keras'):
     """
     Load a saved model from disk
@@ -273,7 +629,13 @@ def load_model(model_name='signature_model', format='keras'):
         print(f"   ✓ Model loaded successfully!")
         
     elif format == 'weights':
-        weights_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_weights.h5')
+        weights_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_weights.npz')
+        
+        # Models saved before the switch to .npz have H5 weights
+        legacy_path = os.path.join(config.SAVED_MODELS_DIR, f'{model_name}_weights.h5')
+        if not os.path.exists(weights_path) and os.path.exists(legacy_path):
+            weights_path = legacy_path
+        
         print(f"\n📥 Loading weights only...")
         print(f"   Path: {weights_path}")
         
@@ -281,13 +643,22 @@ def load_model(model_name='signature_model', format='keras'):
             print(f"\n❌ ERROR: Weights file not found at {weights_path}")
             return None
         
-        # Need to rebuild architecture first
-        print(f"   ⚙️  Rebuilding model architecture...")
-        model = build_model()
+        # Need the architecture first - built once, then reused
+        global _MODEL_CACHE
+        if _MODEL_CACHE is None:
+            print(f"   ⚙️  Rebuilding model architecture...")
+            _MODEL_CACHE = build_model(compile=False)
+        else:
+            print(f"   ♻️  Reusing cached model architecture")
+        model = _MODEL_CACHE
         
         # Load weights
         print(f"   📥 Loading saved weights...")
-        model.load_weights(weights_path)
+        if weights_path.endswith('.npz'):
+            with np.load(weights_path) as data:
+                model.set_weights([data[f'weight_{i}'] for i in range(len(data.files))])
+        else:
+            model.load_weights(weights_path)
         print(f"   ✓ Weights loaded successfully!")
         
     else:
@@ -321,11 +692,36 @@ def list_saved_models():
         print(f"   Expected location: {config.SAVED_MODELS_DIR}")
         return []
     
-    files = os.listdir(config.SAVED_MODELS_DIR)
+    # One pass over the folder - scandir entries carry their file sizes
+    buckets = {'keras': [], 'h5': [], 'weights': []}
+    with os.scandir(config.SAVED_MODELS_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            name = entry.name
+            if name.endswith('.weights.h5'):
+                continue  # Training checkpoint (best.weights.h5) - not a loadable model
+            if name.endswith('.keras'):
+                buckets['keras'].append((name[:-len('.keras')], entry.stat().st_size))
+            elif name.endswith(('_weights.npz', '_weights.h5')):
+                buckets['weights'].append((name.rsplit('_weights.', 1)[0], entry.stat().st_size))
+            elif name.endswith('.h5'):
+                buckets['h5'].append((name[:-len('.h5')], entry.stat().st_size))
+    
+    if not buckets['keras'] and not buckets['h5']:
+        print("\n⚠️  No saved models found!")
+        return []
     
-    keras_models = [f.replace('.keras', '') for f in files if f.endswith('.keras')]
-    h5_models = [f.replace('.h5', '') for f in files if f.endswith('.h5') and not f.endswith('_weights.h5')]
+    for format_type, found in buckets.items():
+        if not found:
+            continue
+        print(f"\n📦 {format_type.upper()} files:")
+        for model_name, size in sorted(found):
+            print(f"   - {model_name} ({size / (1024 * 1024):.2f} MB)")
     
-    if not keras_models and not h5_models:
-        print("\n⚠️  No saved models found!")
-        return []
\ No newline at end of file
+    models = sorted({model_name for model_name, _ in buckets['keras'] + buckets['h5']})
+    
+    print(f"\n✓ Found {len(models)} saved model(s)")
+    print("="*60)
+    
+    return models
@@ -0,0 +1,95 @@
+"""
+Plotting for the Signature Verification training history
+Only needs matplotlib (no TensorFlow), so train.py can draw the plots in a
+separate, lightweight Python process while it evaluates the model
+"""
+
+import sys
+import json
+import matplotlib
+
+import config
+
+# Render plots off-screen (no GUI toolkit to load) unless they should pop up
+if not config.INTERACTIVE_PLOTS:
+    matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+
+def plot_training_history(history, save_path=None):
+    """
+    Plot training history (loss and metrics)
+    
+    Parameters:
+    -----------
+    history : dict
+        Per-epoch metrics (the .history of the keras History object)
+    save_path : str
+        Path to save the plot (optional)
+    """
+    
+    print("\n" + "="*60)
+    print("📊 PLOTTING TRAINING HISTORY")
+    print("="*60)
+    
+    # Create figure with subplots
+    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
+    fig.suptitle('Training History - Signature Verification Model', fontsize=16, fontweight='bold')
+    
+    # Plot 1: Loss
+    axes[0, 0].plot(history['loss'], label='Training Loss', linewidth=2)
+    axes[0, 0].plot(history['val_loss'], label='Validation Loss', linewidth=2)
+    axes[0, 0].set_title('Model Loss', fontsize=12, fontweight='bold')
+    axes[0, 0].set_xlabel('Epoch')
+    axes[0, 0].set_ylabel('Loss')
+    axes[0, 0].legend()
+    axes[0, 0].grid(True, alpha=0.3)
+    
+    # Plot 2: Accuracy
+    axes[0, 1].plot(history['accuracy'], label='Training Accuracy', linewidth=2)
+    axes[0, 1].plot(history['val_accuracy'], label='Validation Accuracy', linewidth=2)
+    axes[0, 1].set_title('Model Accuracy', fontsize=12, fontweight='bold')
+    axes[0, 1].set_xlabel('Epoch')
+    axes[0, 1].set_ylabel('Accuracy')
+    axes[0, 1].legend()
+    axes[0, 1].grid(True, alpha=0.3)
+    
+    # Plot 3: Precision
+    if 'precision' in history:
+        axes[1, 0].plot(history['precision'], label='Training Precision', linewidth=2)
+        axes[1, 0].plot(history['val_precision'], label='Validation Precision', linewidth=2)
+        axes[1, 0].set_title('Model Precision', fontsize=12, fontweight='bold')
+        axes[1, 0].set_xlabel('Epoch')
+        axes[1, 0].set_ylabel('Precision')
+        axes[1, 0].legend()
+        axes[1, 0].grid(True, alpha=0.3)
+    
+    # Plot 4: Recall
+    if 'recall' in history:
+        axes[1, 1].plot(history['recall'], label='Training Recall', linewidth=2)
+        axes[1, 1].plot(history['val_recall'], label='Validation Recall', linewidth=2)
+        axes[1, 1].set_title('Model Recall', fontsize=12, fontweight='bold')
+        axes[1, 1].set_xlabel('Epoch')
+        axes[1, 1].set_ylabel('Recall')
+        axes[1, 1].legend()
+        axes[1, 1].grid(True, alpha=0.3)
+    
+    plt.tight_layout()
+    
+    # Save plot if path provided
+    if save_path:
+        plt.savefig(save_path, dpi=config.PLOT_DPI, bbox_inches='tight')
+        print(f"   ✓ Plot saved to: {save_path}")
+    
+    if config.INTERACTIVE_PLOTS:
+        plt.show()
+    plt.close(fig)
+    
+    print("="*60)
+
+
+if __name__ == "__main__":
+    # Used by train.py: python plotting.py <history.json> <plot.png>
+    with open(sys.argv[1], 'r') as history_file:
+        history = json.load(history_file)
+    plot_training_history(history, save_path=sys.argv[2])
@@ -4,85 +4,213 @@ Trains the neural network and saves the best model
 """
 
 import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
 import numpy as np
-import matplotlib.pyplot as plt
 from datetime import datetime
-import tensorflow as tf
-from tensorflow import keras
 
 # Import our custom modules
 import config
+import plotting
+
+# oneDNN + CPU thread settings (must be set before TensorFlow is imported)
+for _name, _value in config.CPU_ENV_VARS.items():
+    os.environ.setdefault(_name, _value)
+
+import tensorflow as tf
+from tensorflow import keras
+
+# Training owns the whole machine: one thread per physical core
+# (the API server picks its own thread counts per worker in app.py)
+try:
+    tf.config.threading.set_intra_op_parallelism_threads(config.INTRA_OP_THREADS)
+    tf.config.threading.set_inter_op_parallelism_threads(config.INTER_OP_THREADS)
+except RuntimeError as e:
+    # TensorFlow already started running ops - thread pools are fixed by now
+    print(f"⚠️  Could not set TensorFlow threads: {str(e)}")
+
 import data_preprocessing
 import model
 
-def plot_training_history(history, save_path=None):
+def start_plot_process(history, save_path):
     """
-    Plot training history (loss and metrics)
+    Start drawing the training plots in a separate Python process
+    
+    The child runs plotting.py, which only imports matplotlib - not
+    TensorFlow - so it starts fast and doesn't fork/re-import this
+    (multi-threaded) training process
     
     Parameters:
     -----------
-    history : keras.callbacks.History
-        Training history object
+    history : dict
+        Per-epoch metrics (the .history of the keras History object)
     save_path : str
-        Path to save the plot (optional)
+        Path to save the plot
+    
+    Returns:
+    --------
+    process : subprocess.Popen
+        The plotting process (wait() on it; exit code 0 = plot saved)
+    history_path : str
+        Temporary JSON file with the history, delete it once the process ends
+    """
+    fd, history_path = tempfile.mkstemp(suffix='.json')
+    with os.fdopen(fd, 'w') as history_file:
+        json.dump({name: [float(v) for v in values] for name, values in history.items()},
+                  history_file)
+    
+    process = subprocess.Popen([
+        sys.executable,
+        os.path.join(config.BASE_DIR, 'plotting.py'),
+        history_path,
+        save_path
+    ])
+    
+    return process, history_path
+
+
+def stage_for_training(X):
     """
+    Flatten images into the contiguous float32 layout the model consumes
     
-    print("\n" + "="*60)
-    print("📊 PLOTTING TRAINING HISTORY")
-    print("="*60)
+    data_preprocessing already produces float32 pixels scaled to 0-1, so this
+    only flattens (N, 128, 128, 1) → (N, 16384). For contiguous float32 input
+    that's a free view; anything else is converted in a single pass.
+    Done once before training, so tf.data can copy whole buffers as-is.
     
-    # Create figure with subplots
-    fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-    fig.suptitle('Training History - Signature Verification Model', fontsize=16, fontweight='bold')
-    
-    # Plot 1: Loss
-    axes[0, 0].plot(history.history['loss'], label='Training Loss', linewidth=2)
-    axes[0, 0].plot(history.history['val_loss'], label='Validation Loss', linewidth=2)
-    axes[0, 0].set_title('Model Loss', fontsize=12, fontweight='bold')
-    axes[0, 0].set_xlabel('Epoch')
-    axes[0, 0].set_ylabel('Loss')
-    axes[0, 0].legend()
-    axes[0, 0].grid(True, alpha=0.3)
-    
-    # Plot 2: Accuracy
-    axes[0, 1].plot(history.history['accuracy'], label='Training Accuracy', linewidth=2)
-    axes[0, 1].plot(history.history['val_accuracy'], label='Validation Accuracy', linewidth=2)
-    axes[0, 1].set_title('Model Accuracy', fontsize=12, fontweight='bold')
-    axes[0, 1].set_xlabel('Epoch')
-    axes[0, 1].set_ylabel('Accuracy')
-    axes[0, 1].legend()
-    axes[0, 1].grid(True, alpha=0.3)
-    
-    # Plot 3: Precision
-    if 'precision' in history.history:
-        axes[1, 0].plot(history.history['precision'], label='Training Precision', linewidth=2)
-        axes[1, 0].plot(history.history['val_precision'], label='Validation Precision', linewidth=2)
-        axes[1, 0].set_title('Model Precision', fontsize=12, fontweight='bold')
-        axes[1, 0].set_xlabel('Epoch')
-        axes[1, 0].set_ylabel('Precision')
-        axes[1, 0].legend()
-        axes[1, 0].grid(True, alpha=0.3)
-    
-    # Plot 4: Recall
-    if 'recall' in history.history:
-        axes[1, 1].plot(history.history['recall'], label='Training Recall', linewidth=2)
-        axes[1, 1].plot(history.history['val_recall'], label='Validation Recall', linewidth=2)
-        axes[1, 1].set_title('Model Recall', fontsize=12, fontweight='bold')
-        axes[1, 1].set_xlabel('Epoch')
-        axes[1, 1].set_ylabel('Recall')
-        axes[1, 1].legend()
-        axes[1, 1].grid(True, alpha=0.3)
-    
-    plt.tight_layout()
-    
-    # Save plot if path provided
-    if save_path:
-        plt.savefig(save_path, dpi=300, bbox_inches='tight')
-        print(f"   ✓ Plot saved to: {save_path}")
-    
-    plt.show()
+    Parameters:
+    -----------
+    X : numpy array
+        Images of shape (N, 128, 128, 1)
     
-    print("="*60)
+    Returns:
+    --------
+    X_flat : numpy array
+        C-contiguous float32 array of shape (N, 16384)
+    """
+    return np.ascontiguousarray(X.reshape(len(X), -1), dtype=np.float32)
+
+
+def auto_tune_batch(model_obj, X_train):
+    """
+    Pick the training batch size by timing the model on this machine
+    
+    Matrix multiplies get more efficient with bigger batches, until the data
+    no longer fits in the CPU cache. So we time a forward pass for each size
+    in config.BATCH_SIZE_CANDIDATES and pick the LARGEST size that reaches
+    at least 90% of the best throughput (samples per second).
+    Sizes that would leave fewer than config.MIN_STEPS_PER_EPOCH weight
+    updates per epoch are never tried - fast batches are useless if the
+    network barely gets to learn from them.
+    The choice is remembered in saved_models/batch_size_cache.json, so the
+    sweep only runs once per machine and architecture.
+    
+    Parameters:
+    -----------
+    model_obj : keras.Model
+        The neural network model to train
+    X_train : numpy array
+        Training images (timing uses the first images)
+    
+    Returns:
+    --------
+    batch_size : int
+        Chosen batch size
+    """
+    print("\n⏱️  Auto-tuning batch size...")
+    
+    cache_path = os.path.join(config.SAVED_MODELS_DIR, 'batch_size_cache.json')
+    cache_key = (f"{platform.node()}|{platform.processor()}|"
+                 f"{model_obj.count_params()}|{len(X_train)}")
+    
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as cache_file:
+            cache = json.load(cache_file)
+    
+    if cache_key in cache:
+        print(f"   ✓ Using cached batch size: {cache[cache_key]}")
+        return cache[cache_key]
+    
+    @tf.function(reduce_retracing=True)
+    def forward(images):
+        return model_obj(images, training=False)
+    
+    throughput = {}
+    for batch_size in config.BATCH_SIZE_CANDIDATES:
+        # Keep enough weight updates per epoch for training to converge
+        if len(X_train) // batch_size < config.MIN_STEPS_PER_EPOCH:
+            break
+        
+        batch = tf.constant(X_train[:batch_size])
+        forward(batch).numpy()  # First call traces/compiles - not timed
+        
+        start = time.perf_counter()
+        for _ in range(config.AUTO_TUNE_RUNS):
+            forward(batch).numpy()  # .numpy() waits for the result
+        elapsed = time.perf_counter() - start
+        
+        throughput[batch_size] = batch_size * config.AUTO_TUNE_RUNS / elapsed
+        print(f"   Batch {batch_size:4d}: {throughput[batch_size]:,.0f} samples/sec")
+    
+    if not throughput:
+        print(f"   ⚠ Dataset too small to tune, keeping batch size {config.BATCH_SIZE}")
+        return config.BATCH_SIZE
+    
+    peak = max(throughput.values())
+    batch_size = max(size for size, speed in throughput.items() if speed >= 0.9 * peak)
+    print(f"   ✓ Chosen batch size: {batch_size}")
+    
+    cache[cache_key] = batch_size
+    os.makedirs(config.SAVED_MODELS_DIR, exist_ok=True)
+    with open(cache_path, 'w') as cache_file:
+        json.dump(cache, cache_file, indent=2)
+    
+    return batch_size
+
+
+def make_dataset(X, y, training=False):
+    """
+    Build a tf.data input pipeline from NumPy arrays
+    
+    The data is cached after the first pass, batched, and prefetched so the
+    next batch is prepared while the current one is being trained on.
+    Training data is also reshuffled every epoch.
+    
+    Parameters:
+    -----------
+    X : numpy array
+        Images
+    y : numpy array
+        Labels
+    training : bool
+        True for the training set (shuffle, and drop the last partial batch
+        when that throws away only a small part of the data)
+    
+    Returns:
+    --------
+    dataset : tf.data.Dataset
+        Batched (images, labels) dataset
+    """
+    dataset = tf.data.Dataset.from_tensor_slices((X, y)).cache()
+    
+    if training:
+        dataset = dataset.shuffle(
+            len(X),
+            seed=config.RANDOM_SEED,
+            reshuffle_each_iteration=True
+        )
+    
+    # Drop the last partial training batch only if there are enough full
+    # batches that it's a small share of the data (< 1/MIN_STEPS_PER_EPOCH)
+    drop_remainder = training and len(X) // config.BATCH_SIZE >= config.MIN_STEPS_PER_EPOCH
+    dataset = dataset.batch(config.BATCH_SIZE, drop_remainder=drop_remainder)
+    
+    return dataset.prefetch(tf.data.AUTOTUNE)
 
 
 def train_model(X_train, y_train, X_val, y_val, model_obj):
@@ -110,21 +238,22 @@ def train_model(X_train, y_train, X_val, y_val, model_obj):
         Trained model
     """
     
-    print("\n" + "="*60)
-    print("🚀 STARTING MODEL TRAINING")
-    print("="*60)
-    
-    print(f"\n📊 Training Configuration:")
-    print(f"   Epochs: {config.EPOCHS}")
-    print(f"   Batch Size: {config.BATCH_SIZE}")
-    print(f"   Learning Rate: {config.LEARNING_RATE}")
-    print(f"   Optimizer: {config.OPTIMIZER}")
-    print(f"   Early Stopping Patience: {config.EARLY_STOPPING_PATIENCE}")
-    
-    print(f"\n📈 Dataset Sizes:")
-    print(f"   Training samples: {len(X_train)}")
-    print(f"   Validation samples: {len(X_val)}")
-    print(f"   Steps per epoch: {len(X_train) // config.BATCH_SIZE}")
+    if config.VERBOSE_LOGGING:
+        print("\n" + "="*60)
+        print("🚀 STARTING MODEL TRAINING")
+        print("="*60)
+        
+        print(f"\n📊 Training Configuration:")
+        print(f"   Epochs: {config.EPOCHS}")
+        print(f"   Batch Size: {config.BATCH_SIZE}")
+        print(f"   Learning Rate: {config.LEARNING_RATE}")
+        print(f"   Optimizer: {config.OPTIMIZER}")
+        print(f"   Early Stopping Patience: {config.EARLY_STOPPING_PATIENCE}")
+        
+        print(f"\n📈 Dataset Sizes:")
+        print(f"   Training samples: {len(X_train)}")
+        print(f"   Validation samples: {len(X_val)}")
+        print(f"   Steps per epoch: {len(X_train) // config.BATCH_SIZE}")
     
     # Create callbacks
     callbacks = []
@@ -139,17 +268,19 @@ def train_model(X_train, y_train, X_val, y_val, model_obj):
     callbacks.append(early_stopping)
     print(f"\n✓ Early Stopping enabled (patience={config.EARLY_STOPPING_PATIENCE})")
     
-    # 2. Model Checkpoint - saves best model during training
+    # 2. Model Checkpoint - saves best weights during training
+    # Weights only: just the raw numbers, no full model serialization every epoch
     os.makedirs(config.SAVED_MODELS_DIR, exist_ok=True)
-    checkpoint_path = os.path.join(config.SAVED_MODELS_DIR, 'best_model_checkpoint.keras')
+    checkpoint_path = os.path.join(config.SAVED_MODELS_DIR, 'best.weights.h5')
     model_checkpoint = keras.callbacks.ModelCheckpoint(
         filepath=checkpoint_path,
         monitor='val_accuracy',
         save_best_only=True,
+        save_weights_only=True,
         verbose=1
     )
     callbacks.append(model_checkpoint)
-    print(f"✓ Model Checkpoint enabled (saves best model automatically)")
+    print(f"✓ Model Checkpoint enabled (saves best weights automatically)")
     
     # 3. Reduce Learning Rate on Plateau - adjusts LR if stuck
     reduce_lr = keras.callbacks.ReduceLROnPlateau(
@@ -168,13 +299,16 @@ def train_model(X_train, y_train, X_val, y_val, model_obj):
     print("="*60)
     print("\n")
     
+    # Input pipelines (cached, shuffled, prefetched)
+    train_ds = make_dataset(X_train, y_train, training=True)
+    val_ds = make_dataset(X_val, y_val)
+    
     start_time = datetime.now()
     
     history = model_obj.fit(
-        X_train, y_train,
-        batch_size=config.BATCH_SIZE,
+        train_ds,
         epochs=config.EPOCHS,
-        validation_data=(X_val, y_val),
+        validation_data=val_ds,
         callbacks=callbacks,
         verbose=config.VERBOSE
     )
@@ -182,28 +316,34 @@ def train_model(X_train, y_train, X_val, y_val, model_obj):
     end_time = datetime.now()
     training_duration = end_time - start_time
     
-    print("\n" + "="*60)
-    print("✅ TRAINING COMPLETED!")
-    print("="*60)
-    print(f"\n⏱️  Training Duration: {training_duration}")
-    print(f"   Started:  {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"   Finished: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Print final metrics
-    print(f"\n📊 Final Training Metrics:")
-    final_epoch = len(history.history['loss'])
-    print(f"   Epochs completed: {final_epoch}/{config.EPOCHS}")
-    print(f"   Training Loss: {history.history['loss'][-1]:.4f}")
-    print(f"   Training Accuracy: {history.history['accuracy'][-1]:.4f}")
-    print(f"   Validation Loss: {history.history['val_loss'][-1]:.4f}")
-    print(f"   Validation Accuracy: {history.history['val_accuracy'][-1]:.4f}")
-    
-    if 'precision' in history.history:
-        print(f"   Validation Precision: {history.history['val_precision'][-1]:.4f}")
-    if 'recall' in history.history:
-        print(f"   Validation Recall: {history.history['val_recall'][-1]:.4f}")
-    
-    print("="*60)
+    # Restore the best checkpointed weights before the model gets saved
+    if os.path.exists(checkpoint_path):
+        model_obj.load_weights(checkpoint_path)
+        print(f"\n✓ Restored best weights from: {checkpoint_path}")
+    
+    if config.VERBOSE_LOGGING:
+        print("\n" + "="*60)
+        print("✅ TRAINING COMPLETED!")
+        print("="*60)
+        print(f"\n⏱️  Training Duration: {training_duration}")
+        print(f"   Started:  {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        print(f"   Finished: {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Print final metrics
+        print(f"\n📊 Final Training Metrics:")
+        final_epoch = len(history.history['loss'])
+        print(f"   Epochs completed: {final_epoch}/{config.EPOCHS}")
+        print(f"   Training Loss: {history.history['loss'][-1]:.4f}")
+        print(f"   Training Accuracy: {history.history['accuracy'][-1]:.4f}")
+        print(f"   Validation Loss: {history.history['val_loss'][-1]:.4f}")
+        print(f"   Validation Accuracy: {history.history['val_accuracy'][-1]:.4f}")
+        
+        if 'precision' in history.history:
+            print(f"   Validation Precision: {history.history['val_precision'][-1]:.4f}")
+        if 'recall' in history.history:
+            print(f"   Validation Recall: {history.history['val_recall'][-1]:.4f}")
+        
+        print("="*60)
     
     return history, model_obj
 
@@ -220,6 +360,11 @@ def evaluate_model(model_obj, X_test, y_test):
         Test images
     y_test : numpy array
         Test labels
+    
+    Returns:
+    --------
+    test_results : list
+        [loss, accuracy, precision, recall] on the test set
     """
     
     print("\n" + "="*60)
@@ -228,41 +373,56 @@ def evaluate_model(model_obj, X_test, y_test):
     
     print(f"\n📊 Test Dataset:")
     print(f"   Total samples: {len(X_test)}")
-    print(f"   Genuine: {sum(y_test)}")
-    print(f"   Forged: {len(y_test) - sum(y_test)}")
+    print(f"   Genuine: {int(y_test.sum())}")
+    print(f"   Forged: {len(y_test) - int(y_test.sum())}")
     
-    print(f"\n🔄 Running evaluation...")
+    # ONE forward pass over the test set - every metric is computed from it
+    # (no gradients here, so bigger batches fit and run more efficiently)
+    print(f"\n🔮 Making predictions on test set...")
+    y_pred_prob = model_obj.predict(X_test, batch_size=config.BATCH_SIZE * 4, verbose=0)
+    logits = None
+    if model.outputs_logits(model_obj):
+        logits = y_pred_prob.ravel().astype(np.float64)
+        y_pred_prob = tf.math.sigmoid(y_pred_prob).numpy()
+    # One boolean array (True = genuine) - sklearn takes booleans directly
+    y_pred = y_pred_prob.ravel() > config.CONFIDENCE_THRESHOLD
     
-    # Evaluate on test set
-    test_results = model_obj.evaluate(X_test, y_test, verbose=0)
+    # Calculate confusion matrix
+    from sklearn.metrics import confusion_matrix, classification_report
+    
+    cm = confusion_matrix(y_test, y_pred, labels=[0, 1])
+    tn, fp, fn, tp = cm.ravel()
+    
+    # Same metrics as model.evaluate(), from the predictions above
+    # Loss = binary cross-entropy, computed the way the training loss is:
+    # from the logits (numerically stable form of BCE with from_logits=True),
+    # or from clipped probabilities (like Keras, to avoid log(0)) for
+    # older models that end in a sigmoid
+    labels = y_test.astype(np.float64)
+    if logits is not None:
+        loss = np.mean(np.logaddexp(0, logits) - labels * logits)
+    else:
+        prob = np.clip(y_pred_prob.ravel().astype(np.float64), 1e-7, 1 - 1e-7)
+        loss = -np.mean(labels * np.log(prob) + (1 - labels) * np.log(1 - prob))
+    accuracy = (tp + tn) / len(y_test)
+    precision = tp / (tp + fp) if (tp + fp) else 0.0
+    recall = tp / (tp + fn) if (tp + fn) else 0.0
+    
+    test_results = [float(loss), float(accuracy), float(precision), float(recall)]
     
     print("\n" + "="*60)
     print("📈 TEST RESULTS")
     print("="*60)
     
-    metric_names = model_obj.metrics_names
-    for name, value in zip(metric_names, test_results):
+    for name, value in zip(['loss', 'accuracy', 'precision', 'recall'], test_results):
         print(f"   {name.capitalize()}: {value:.4f}")
     
-    # Make predictions
-    print(f"\n🔮 Making predictions on test set...")
-    y_pred_prob = model_obj.predict(X_test, verbose=0)
-    y_pred = (y_pred_prob > config.CONFIDENCE_THRESHOLD).astype(int).flatten()
-    
-    # Calculate confusion matrix
-    from sklearn.metrics import confusion_matrix, classification_report
-    
-    cm = confusion_matrix(y_test, y_pred)
-    
     print("\n📊 Confusion Matrix:")
     print(f"                Predicted")
     print(f"                Forged  Genuine")
     print(f"   Actual Forged   {cm[0][0]:4d}    {cm[0][1]:4d}")
     print(f"   Actual Genuine  {cm[1][0]:4d}    {cm[1][1]:4d}")
     
-    # Calculate metrics
-    tn, fp, fn, tp = cm.ravel()
-    
     print("\n📈 Detailed Metrics:")
     print(f"   True Negatives (TN):  {tn} (Correctly identified forged)")
     print(f"   False Positives (FP): {fp} (Forged classified as genuine)")
@@ -302,6 +462,12 @@ def main():
     X_val, y_val = val_data
     X_test, y_test = test_data
     
+    # Flatten images once up front: (N, 128, 128, 1) → (N, 16384)
+    # The model takes flat vectors, so no reshape runs on every step
+    X_train = stage_for_training(X_train)
+    X_val = stage_for_training(X_val)
+    X_test = stage_for_training(X_test)
+    
     # Step 2: Build model
     print("\n" + "="*70)
     print("STEP 2: MODEL BUILDING")
@@ -315,6 +481,10 @@ def main():
     print("STEP 3: MODEL TRAINING")
     print("="*70)
     
+    # Batch size that runs fastest on this machine (used by the whole run)
+    if config.AUTO_TUNE_BATCH:
+        config.BATCH_SIZE = auto_tune_batch(model_obj, X_train)
+    
     history, trained_model = train_model(X_train, y_train, X_val, y_val, model_obj)
     
     # Step 4: Save model
@@ -325,10 +495,21 @@ def main():
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     model_name = f'signature_model_{timestamp}'
     
-    save_paths = model.save_model(trained_model, model_name=model_name)
+    # Training images calibrate the INT8 quantization of the TFLite export
+    # (and of the TensorRT engine when TENSORRT_PRECISION is INT8)
+    save_paths = model.save_model(trained_model, model_name=model_name,
+                                  representative_data=X_train)
     
-    # Also save as default name for easy loading
-    model.save_model(trained_model, model_name='signature_model_latest')
+    # Also make it available under the default name for easy loading
+    # (links to the files above instead of saving everything twice)
+    model.link_saved_model(save_paths, model_name, 'signature_model_latest')
+    
+    # Draw the training plots in a background process while evaluation runs
+    # (interactive plots need this process's GUI, so they are drawn in Step 6)
+    plot_save_path = os.path.join(config.SAVED_MODELS_DIR, f'training_history_{timestamp}.png')
+    plot_process = None
+    if not config.INTERACTIVE_PLOTS:
+        plot_process, history_path = start_plot_process(history.history, plot_save_path)
     
     # Step 5: Evaluate model
     print("\n" + "="*70)
@@ -342,8 +523,14 @@ def main():
     print("STEP 6: VISUALIZING RESULTS")
     print("="*70)
     
-    plot_save_path = os.path.join(config.SAVED_MODELS_DIR, f'training_history_{timestamp}.png')
-    plot_training_history(history, save_path=plot_save_path)
+    plot_saved = True
+    if plot_process is None:
+        plotting.plot_training_history(history.history, save_path=plot_save_path)
+    else:
+        plot_saved = plot_process.wait() == 0
+        os.remove(history_path)
+        if not plot_saved:
+            print(f"\n⚠️  Plotting failed (exit code {plot_process.returncode}) - no plot saved")
     
     # Final summary
     print("\n" + "="*70)
@@ -352,7 +539,8 @@ def main():
     
     print(f"\n📁 Saved Files:")
     print(f"   Model: {save_paths['keras']}")
-    print(f"   Plot: {plot_save_path}")
+    if plot_saved:
+        print(f"   Plot: {plot_save_path}")
     
     print(f"\n📊 Final Performance:")
     print(f"   Test Accuracy: {test_results[1]:.2%}")